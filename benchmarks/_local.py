@@ -0,0 +1,212 @@
+"""
+    Local stand-ins used by benchmarks instead of real websites
+"""
+import time
+import zlib
+import socket
+import random
+import asyncio
+from urllib.parse import urlsplit
+from typing import (
+    Awaitable,
+    Callable,
+)
+
+from aiohttp import web
+
+from benchmarks import samples
+
+
+async def start_server(
+        handler: Callable[[web.BaseRequest], Awaitable[web.StreamResponse]],
+        host: str = '127.0.0.1',
+        port: int = 0
+) -> tuple[web.ServerRunner, int]:
+    """
+        Run low-level aiohttp server, which handles any path including absolute urls
+        sent to http proxy. Return runner to cleanup and listening port
+    """
+
+    runner = web.ServerRunner(web.Server(handler))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
+
+
+async def start_echo_proxies(hosts: list[str], port: int, delay: float = 0.) -> list[web.ServerRunner]:
+    """
+        Stand-in http proxies on each of `hosts` (e.g. 127.0.0.2, 127.0.0.3, ...) answering any request
+        with IP the client connected to, the same as icanhazip.com answers through working proxy
+    """
+
+    async def handler(request: web.BaseRequest) -> web.Response:
+        if delay:
+            await asyncio.sleep(delay)
+        return web.Response(text=f'{request.transport.get_extra_info("sockname")[0]}\n')
+
+    runners = []
+    for host in hosts:
+        runner, _ = await start_server(handler, host, port)
+        runners.append(runner)
+    return runners
+
+
+def loopback_hosts(count: int) -> list[str]:
+    """
+        Distinct loopback addresses 127.0.x.y, available without configuration on Linux
+    """
+
+    return [f'127.0.{i // 250}.{i % 250 + 2}' for i in range(count)]
+
+
+async def _relay(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _socks5_handshake(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> tuple[str, int]:
+    _, methods_count = await reader.readexactly(2)
+    await reader.readexactly(methods_count)
+    writer.write(b'\x05\x00')
+    _, _, _, address_type = await reader.readexactly(4)
+    match address_type:
+        case 1:
+            host = socket.inet_ntoa(await reader.readexactly(4))
+        case 3:
+            host = (await reader.readexactly((await reader.readexactly(1))[0])).decode()
+        case _:
+            host = socket.inet_ntop(socket.AF_INET6, await reader.readexactly(16))
+    port = int.from_bytes(await reader.readexactly(2), 'big')
+    writer.write(b'\x05\x00\x00\x01' + bytes(6))
+    return host, port
+
+
+async def _socks4_handshake(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> tuple[str, int]:
+    header = await reader.readexactly(8)
+    port = int.from_bytes(header[2:4], 'big')
+    host = socket.inet_ntoa(header[4:8])
+    await reader.readuntil(b'\x00')  # user id
+    if header[4:7] == bytes(3):
+        # socks4a, domain follows user id
+        host = (await reader.readuntil(b'\x00'))[:-1].decode()
+    writer.write(b'\x00\x5a' + bytes(6))
+    return host, port
+
+
+async def start_fake_proxy(
+        protocol: str,
+        host: str,
+        port: int,
+        latency: float = 0.,
+        failure_rate: float = 0.,
+) -> asyncio.AbstractServer:
+    """
+        Stand-in http, socks4 or socks5 proxy. Connection is delayed by `latency` seconds and dropped with
+        `failure_rate` probability. Outgoing connections are bound to `host`, so judge sees it as proxy IP
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            if latency:
+                await asyncio.sleep(latency)
+            if random.random() < failure_rate:
+                writer.close()
+                return
+
+            head = b''
+            match protocol:
+                case 'socks5':
+                    target = await _socks5_handshake(reader, writer)
+                case 'socks4':
+                    target = await _socks4_handshake(reader, writer)
+                case _:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                    method, url, version = head.split(b'\r\n', 1)[0].decode().split(' ')
+                    if method == 'CONNECT':
+                        target_host, target_port = url.rsplit(':', 1)
+                        target = target_host, int(target_port)
+                        writer.write(b'HTTP/1.1 200 Connection established\r\n\r\n')
+                        head = b''
+                    else:
+                        parsed = urlsplit(url)
+                        target = parsed.hostname, parsed.port or 80
+                        path = parsed.path or '/'
+                        if parsed.query:
+                            path += f'?{parsed.query}'
+                        head = f'{method} {path} {version}'.encode() + head[head.index(b'\r\n'):]
+
+            up_reader, up_writer = await asyncio.open_connection(*target, local_addr=(host, 0))
+            if head:
+                up_writer.write(head)
+            await asyncio.gather(_relay(reader, up_writer), _relay(up_reader, writer))
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def start_sources(port: int, pages: int = 5, geonode_total: int = 5000,
+                        socks4_for_hidemy: list[str] = ()) -> web.AppRunner:
+    """
+        Stand-in of free-proxy-list.net, geonode.com API and hidemy.name with sample pages.
+        `socks4_for_hidemy` are added to geonode.com first page, hidemy.name is scraped through them
+    """
+
+    free_proxy_list = samples.load('free-proxy-list.net.html')
+    hidemy_name = [samples.hidemy_name(last_page=pages - 1, seed=page) for page in range(pages)]
+
+    free_proxy_list_etag = f'"{zlib.crc32(free_proxy_list.encode()):x}"'
+
+    async def free_proxy_list_handler(request: web.Request) -> web.Response:
+        if request.headers.get('If-None-Match') == free_proxy_list_etag:
+            return web.Response(status=304)
+        return web.Response(text=free_proxy_list, content_type='text/html', headers={'ETag': free_proxy_list_etag})
+
+    async def geonode_handler(request: web.Request) -> web.Response:
+        limit, page = int(request.query['limit']), int(request.query['page'])
+        data = samples.geonode(limit, page, geonode_total)
+        now = int(time.time())
+        for i, proxy in enumerate(data['data']):
+            # random addresses are not reachable, hidemy.name must be scraped only through local proxies
+            proxy['protocols'] = [p if p != 'socks4' else 'socks5' for p in proxy['protocols']]
+            if request.query.get('sort_by') == 'lastChecked':
+                # one proxy is checked every second, the latest first
+                proxy['lastChecked'] = now - (page - 1) * limit - i
+        if page == 1:
+            for proxy in socks4_for_hidemy:
+                ip, proxy_port = proxy.split(':')
+                data['data'].append({'ip': ip, 'port': proxy_port, 'protocols': ['socks4'], 'country': 'US',
+                                     'anonymityLevel': 'elite', 'lastChecked': 0})
+        return web.json_response(data)
+
+    async def hidemy_name_handler(request: web.Request) -> web.Response:
+        page = int(request.query.get('start', 0)) // 64
+        return web.Response(text=hidemy_name[page % len(hidemy_name)], content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/free-proxy-list.net', free_proxy_list_handler)
+    app.router.add_get('/geonode.com/api/proxy-list', geonode_handler)
+    app.router.add_get('/hidemy.name/en/proxy-list/', hidemy_name_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+
+def source_urls(port: int) -> dict[str, str]:
+    """
+        URLs of registered sources pointing to `start_sources()` stand-in
+    """
+
+    return {
+        'free-proxy-list.net': f'http://127.0.0.1:{port}/free-proxy-list.net',
+        'geonode.com': f'http://127.0.0.1:{port}/geonode.com/api/proxy-list',
+        'hidemy.name': f'http://127.0.0.1:{port}/hidemy.name/en/proxy-list/',
+    }
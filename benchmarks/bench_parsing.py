@@ -0,0 +1,87 @@
+"""
+    Parse time of saved sample pages: BeautifulSoup (previous implementation) against lxml XPath parsers,
+    and how long event loop is blocked while parsing inline or in Parser thread pool.
+    Run: python -m benchmarks.bench_parsing
+"""
+import time
+import asyncio
+import argparse
+from typing import Callable
+
+from proxy_master import Parser
+from benchmarks import samples
+
+
+def bs4_free_proxy_list(html: str) -> list:
+    from bs4 import BeautifulSoup
+    return [[td.text for td in tr.find_all('td')] for tr in BeautifulSoup(html, 'lxml').table.tbody.find_all('tr')]
+
+
+def bs4_hidemy_name(html: str) -> list:
+    from bs4 import BeautifulSoup
+    import pycountry
+
+    rows = []
+    for tr in BeautifulSoup(html, 'lxml').table.tbody.find_all('tr'):
+        country = tr.find('span', class_='country').text.strip().lower()
+        try:
+            country = pycountry.countries.search_fuzzy(country)[0].alpha_2
+        except LookupError:
+            country = None
+        rows.append([td.text for td in tr.find_all('td')] + [country])
+    return rows
+
+
+def timeit(func: Callable, html: str, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        func(html)
+    return (time.perf_counter() - started) / number * 1000
+
+
+async def max_loop_lag(func: Callable, html: str, number: int, offload: bool) -> float:
+    """ Max delay of 1ms ticker while pages are parsed """
+
+    lags = []
+
+    async def ticker() -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - started - 0.001)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    for _ in range(number):
+        if offload:
+            await Parser.run(func, html)
+        else:
+            func(html)
+            await asyncio.sleep(0)
+    task.cancel()
+    return max(lags) * 1000
+
+
+def main(number: int) -> None:
+    pages = {
+        'free-proxy-list.net': (samples.load('free-proxy-list.net.html'), bs4_free_proxy_list,
+                                lambda html: Parser.free_proxy_list(html, do_prints=False)),
+        'hidemy.name': (samples.load('hidemy.name.html'), bs4_hidemy_name,
+                        lambda html: Parser.hidemy_name(html, do_prints=False)),
+    }
+    for domain, (html, bs4_parser, parser) in pages.items():
+        print(f'{domain} ({len(html) // 1024} KB)')
+        try:
+            print(f'  BeautifulSoup: {timeit(bs4_parser, html, number):8.3f} ms/page')
+        except ImportError:
+            print('  BeautifulSoup: not installed')
+        print(f'  lxml XPath:    {timeit(parser, html, number):8.3f} ms/page')
+        inline = asyncio.run(max_loop_lag(parser, html, number, offload=False))
+        offloaded = asyncio.run(max_loop_lag(parser, html, number, offload=True))
+        print(f'  max event loop lag: inline {inline:.3f} ms | thread pool {offloaded:.3f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=10)
+    main(parser.parse_args().number)
@@ -0,0 +1,105 @@
+"""
+    Whole-pool sweep with and without TCP connect / SOCKS5 greeting probe before full check.
+    Pool is mix of working fake socks5 proxies, silent ones accepting connection but never answering
+    and closed ports, all on distinct loopback addresses served by separate process.
+    Run: python -m benchmarks.bench_prefilter --working 200 --silent 800 --closed 1000
+"""
+import time
+import asyncio
+import argparse
+import multiprocessing
+
+from proxy_master import (
+    METRICS,
+    LocalJudge,
+    Scraper,
+    SessionManager,
+)
+from proxy_master.judge import start_judge_server
+from benchmarks._local import (
+    loopback_hosts,
+    start_fake_proxy,
+)
+from benchmarks.harness import ResourceSampler
+
+PORT = 18300
+CLOSED_PORT = 18301
+JUDGE_PORT = 18302
+
+
+def serve(working: list[str], silent: list[str], ready: multiprocessing.Event) -> None:
+    async def handle_silent(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await reader.read()
+        writer.close()
+
+    async def run() -> None:
+        await start_judge_server('127.0.0.1', JUDGE_PORT)
+        for host in working:
+            await start_fake_proxy('socks5', host, PORT)
+        for host in silent:
+            await asyncio.start_server(handle_silent, host, PORT)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+async def sweep(proxies: list[str], prefilter: float | None, timeout: float, limit: int) -> dict:
+    METRICS.reset()
+    working = 0
+    with ResourceSampler() as sampler:
+        started = time.perf_counter()
+        async for result in Scraper.iter_test_public_ip(
+                proxies,
+                proxy_protocol='socks5',
+                website_protocol='http',
+                url=LocalJudge(f'127.0.0.1:{JUDGE_PORT}/'),
+                timeout=timeout,
+                limit=limit,
+                prefilter=prefilter
+        ):
+            working += result.working
+        elapsed = time.perf_counter() - started
+    await SessionManager.close()
+    passed = sum(v for (name, labels), v in METRICS.counters.items()
+                 if name == 'prefilter_total' and ('result', 'passed') in labels)
+    return {
+        'wall_time_s': elapsed,
+        'working': working,
+        'full_checks': passed if prefilter is not None else len(proxies),
+        'peak_fds': sampler.peak_fds,
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    hosts = loopback_hosts(args.working + args.silent + args.closed)
+    working = hosts[:args.working]
+    silent = hosts[args.working:args.working + args.silent]
+    closed = hosts[args.working + args.silent:]
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(working, silent, ready), daemon=True)
+    server.start()
+    ready.wait()
+
+    proxies = [f'{host}:{PORT}' for host in working + silent] + [f'{host}:{CLOSED_PORT}' for host in closed]
+    print(f'{len(working)} working, {len(silent)} silent, {len(closed)} closed socks5 proxies, '
+          f'timeout {args.timeout} s, limit {args.limit}')
+    try:
+        for name, prefilter in (('full check only', None), ('with prefilter', args.prefilter)):
+            r = asyncio.run(sweep(proxies, prefilter, args.timeout, args.limit))
+            print(f'{name:16} {r["wall_time_s"]:6.2f} s | {len(proxies) / r["wall_time_s"]:8.1f} proxies/s | '
+                  f'{r["full_checks"]} full checks | {r["working"]} working | peak FDs {r["peak_fds"]}')
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--working', type=int, default=200)
+    parser.add_argument('--silent', type=int, default=800)
+    parser.add_argument('--closed', type=int, default=1000)
+    parser.add_argument('--timeout', type=float, default=3)
+    parser.add_argument('--prefilter', type=float, default=1.5)
+    parser.add_argument('--limit', type=int, default=200)
+    args = parser.parse_args()
+    main(args)
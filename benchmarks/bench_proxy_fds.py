@@ -0,0 +1,94 @@
+"""
+    Open file descriptors during and after sweep of many distinct working proxies.
+    Checked proxies must not keep idle connections, otherwise large sweeps fail with EMFILE
+    under default limit of 1024 descriptors, which is set for this process with --fd-limit.
+    Run: python -m benchmarks.bench_proxy_fds --protocol http --proxies 2000
+"""
+import asyncio
+import resource
+import argparse
+import multiprocessing
+
+from proxy_master import (
+    LocalJudge,
+    Scraper,
+    SessionManager,
+)
+from proxy_master.judge import start_judge_server
+from benchmarks._local import (
+    loopback_hosts,
+    start_fake_proxy,
+)
+from benchmarks.harness import (
+    ResourceSampler,
+    count_fds,
+)
+
+PORT = 18310
+JUDGE_PORT = 18311
+
+
+def serve(protocol: str, hosts: list[str], ready: multiprocessing.Event) -> None:
+    async def run() -> None:
+        await start_judge_server('127.0.0.1', JUDGE_PORT)
+        for host in hosts:
+            await start_fake_proxy(protocol, host, PORT)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+async def sweep(proxies: list[str], protocol: str, prefilter: float | None, limit: int) -> dict:
+    working = 0
+    with ResourceSampler() as sampler:
+        async for result in Scraper.iter_test_public_ip(
+                proxies,
+                proxy_protocol=protocol,
+                website_protocol='http',
+                url=LocalJudge(f'127.0.0.1:{JUDGE_PORT}/'),
+                timeout=10,
+                limit=limit,
+                prefilter=prefilter
+        ):
+            working += result.working
+    # sessions are still open, as in long-running process checking proxies again and again
+    await asyncio.sleep(0.5)
+    fds_after = count_fds()
+    await SessionManager.close()
+    return {
+        'working': working,
+        'peak_fds': sampler.peak_fds,
+        'fds_after': fds_after,
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    hosts = loopback_hosts(args.proxies)
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(args.protocol, hosts, ready), daemon=True)
+    server.start()
+    ready.wait()
+
+    if args.fd_limit:
+        _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(args.fd_limit, hard), hard))
+    proxies = [f'{host}:{PORT}' for host in hosts]
+    print(f'{len(proxies)} working {args.protocol} proxies, limit {args.limit}, FD limit {args.fd_limit}')
+    try:
+        for name, prefilter in (('full check only', None), ('with prefilter', args.prefilter)):
+            r = asyncio.run(sweep(proxies, args.protocol, prefilter, args.limit))
+            print(f'{name:16} {r["working"]} working | peak FDs {r["peak_fds"]} | FDs after sweep {r["fds_after"]}')
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--protocol', default='http', choices=('http', 'socks4', 'socks5'))
+    parser.add_argument('--proxies', type=int, default=2000)
+    parser.add_argument('--prefilter', type=float, default=1.5)
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--fd-limit', type=int, default=1024)
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,62 @@
+"""
+    Requests/sec of Scraper.send_request with one-off ClientSession per request (old behaviour)
+    against shared sessions of SessionManager. Run: python -m benchmarks.bench_sessions
+"""
+import time
+import asyncio
+import argparse
+
+from aiohttp import (
+    web,
+    TCPConnector,
+)
+
+from proxy_master import (
+    Scraper,
+    SessionManager,
+)
+from benchmarks._local import start_server
+
+
+async def run(requests: int, concurrency: int, pooled: bool, url: str) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request() -> None:
+        async with semaphore:
+            await Scraper.send_request(
+                url=url,
+                response_type='text',
+                connector=None if pooled else TCPConnector(),
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    await SessionManager.close()
+    return requests / elapsed
+
+
+async def main(requests: int, concurrency: int) -> None:
+    async def handler(request: web.BaseRequest) -> web.Response:
+        return web.Response(text='127.0.0.1\n')
+
+    runner, port = await start_server(handler)
+    url = f'http://127.0.0.1:{port}/'
+    try:
+        one_off = await run(requests, concurrency, pooled=False, url=url)
+        pooled = await run(requests, concurrency, pooled=True, url=url)
+    finally:
+        await runner.cleanup()
+
+    print(f'{requests} requests, concurrency {concurrency}')
+    print(f'session per request: {one_off:10.1f} req/s | {1000 / one_off:.3f} ms/request')
+    print(f'shared session:      {pooled:10.1f} req/s | {1000 / pooled:.3f} ms/request')
+    print(f'speedup: x{pooled / one_off:.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,76 @@
+"""
+    Throughput of proxy checks by one event loop against sharded mode with several processes.
+    Stand-in proxies run in separate process on distinct loopback addresses.
+    Run: python -m benchmarks.bench_sharding --proxies 20000 --processes 1 2 4
+"""
+import os
+import time
+import asyncio
+import argparse
+import multiprocessing
+
+from proxy_master import (
+    Scraper,
+    SessionManager,
+)
+from benchmarks._local import (
+    loopback_hosts,
+    start_echo_proxies,
+)
+
+PORT = 18090
+
+
+def serve(hosts: list[str], delay: float, ready: multiprocessing.Event) -> None:
+    async def run() -> None:
+        await start_echo_proxies(hosts, PORT, delay)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+async def check(proxies: list[str], processes: int, limit: int) -> tuple[float, int]:
+    started = time.perf_counter()
+    working = 0
+    async for result in Scraper.iter_test_public_ip(
+            proxies,
+            proxy_protocol='http',
+            website_protocol='http',
+            timeout=10,
+            limit=limit,
+            processes=processes
+    ):
+        working += result.working
+    elapsed = time.perf_counter() - started
+    await SessionManager.close()
+    return elapsed, working
+
+
+def main(count: int, hosts_count: int, processes_list: list[int], limit: int, delay: float) -> None:
+    hosts = loopback_hosts(hosts_count)
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(hosts, delay, ready), daemon=True)
+    server.start()
+    ready.wait()
+
+    proxies = [f'{hosts[i % len(hosts)]}:{PORT}' for i in range(count)]
+    print(f'{count} proxies on {len(hosts)} hosts, proxy delay {delay * 1000:.0f} ms, '
+          f'limit {limit} per process, {os.cpu_count()} CPUs')
+    try:
+        for processes in processes_list:
+            elapsed, working = asyncio.run(check(proxies, processes, limit))
+            print(f'processes={processes}: {elapsed:7.2f} s | {count / elapsed:9.1f} checks/s | {working} working')
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--proxies', type=int, default=5000)
+    parser.add_argument('--hosts', type=int, default=500)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--limit', type=int, default=500)
+    parser.add_argument('--delay', type=float, default=0.05)
+    args = parser.parse_args()
+    main(args.proxies, args.hosts, args.processes, args.limit, args.delay)
@@ -0,0 +1,184 @@
+"""
+    Benchmark of the whole pipeline against local stand-ins: sources with sample pages, judge server and
+    fake http/socks4/socks5 proxies with configurable latency and failure rate, all in separate process.
+    Reports scrape wall time, parse time per page, verification throughput, peak memory and FD usage.
+    Run: python -m benchmarks.harness [--output results.json]
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from pathlib import Path
+
+import proxy_master.proxy_master as pm
+from benchmarks import samples
+from benchmarks._local import (
+    loopback_hosts,
+    source_urls,
+    start_fake_proxy,
+    start_sources,
+)
+from proxy_master.judge import start_judge_server
+
+SOURCES_PORT = 18200
+JUDGE_PORT = 18201
+PROXY_PORTS = {'http': 18210, 'socks4': 18211, 'socks5': 18212}
+
+
+def serve(args: argparse.Namespace, hosts: list[str], ready: multiprocessing.Event) -> None:
+    async def run() -> None:
+        hidemy_proxies = [f'{host}:{PROXY_PORTS["socks4"]}' for host in hosts[:args.hidemy_proxies]]
+        await start_sources(SOURCES_PORT, args.pages, args.geonode_total, hidemy_proxies)
+        await start_judge_server('127.0.0.1', JUDGE_PORT)
+        for protocol, port in PROXY_PORTS.items():
+            for i, host in enumerate(hosts):
+                # proxies used to scrap hidemy.name never fail
+                failure_rate = 0 if protocol == 'socks4' and i < args.hidemy_proxies else args.failure_rate
+                await start_fake_proxy(protocol, host, port, args.latency, failure_rate)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+def count_fds() -> int | None:
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return None
+
+
+class ResourceSampler:
+    """ Peak count of open file descriptors sampled in event loop """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak_fds = count_fds()
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            fds = count_fds()
+            if fds is not None:
+                self.peak_fds = max(self.peak_fds, fds)
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self) -> 'ResourceSampler':
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._task.cancel()
+
+
+def bench_parse(number: int) -> dict[str, float]:
+    """ Milliseconds per page """
+
+    parsers = {
+        'free-proxy-list.net': (samples.load('free-proxy-list.net.html'),
+                                lambda page: pm.Parser.free_proxy_list(page, do_prints=False)),
+        'geonode.com': (samples.load('geonode.com.json'), json.loads),
+        'hidemy.name': (samples.load('hidemy.name.html'), lambda page: pm.Parser.hidemy_name(page, do_prints=False)),
+    }
+    results = {}
+    for domain, (page, parser) in parsers.items():
+        started = time.perf_counter()
+        for _ in range(number):
+            parser(page)
+        results[domain] = (time.perf_counter() - started) / number * 1000
+    return results
+
+
+async def bench_scrape(store: pm.ProxyStore) -> dict:
+    with ResourceSampler() as sampler:
+        started = time.perf_counter()
+        await pm.Scraper.refresh(store, do_prints=False)
+        elapsed = time.perf_counter() - started
+    await pm.SessionManager.close()
+    return {
+        'wall_time_s': elapsed,
+        'rows': {source: len(store.get_proxies_list(source=source)) for source in pm.SOURCES},
+        'peak_fds': sampler.peak_fds,
+    }
+
+
+async def bench_verify(protocol: str, hosts: list[str], checks: int, limit: int) -> dict:
+    proxies = [f'{hosts[i % len(hosts)]}:{PROXY_PORTS[protocol]}' for i in range(checks)]
+    judge = pm.LocalJudge(f'127.0.0.1:{JUDGE_PORT}/')
+    working = 0
+    with ResourceSampler() as sampler:
+        started = time.perf_counter()
+        async for result in pm.Scraper.iter_test_public_ip(
+                proxies, protocol, 'http', url=judge, timeout=10, limit=limit, limit_per_host=None
+        ):
+            working += result.working
+        elapsed = time.perf_counter() - started
+    await pm.SessionManager.close()
+    return {
+        'checks_per_s': checks / elapsed,
+        'success_rate': working / checks,
+        'peak_fds': sampler.peak_fds,
+    }
+
+
+def main(args: argparse.Namespace) -> dict:
+    hosts = loopback_hosts(args.hosts)
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(args, hosts, ready), daemon=True)
+    server.start()
+    ready.wait()
+
+    for domain, url in source_urls(SOURCES_PORT).items():
+        pm.SOURCES[domain].url = url
+    results = {}
+    try:
+        results['parse_ms_per_page'] = bench_parse(args.parse_number)
+        with tempfile.TemporaryDirectory() as directory, pm.ProxyStore(Path(directory, 'bench.sqlite3')) as store:
+            results['scrape'] = asyncio.run(bench_scrape(store))
+        results['verify'] = {
+            protocol: asyncio.run(bench_verify(protocol, hosts, args.checks, args.limit)) for protocol in PROXY_PORTS
+        }
+        # ru_maxrss is in kilobytes on Linux
+        results['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    finally:
+        server.terminate()
+    return results
+
+
+def report(results: dict) -> None:
+    print('parse time per page:')
+    for domain, ms in results['parse_ms_per_page'].items():
+        print(f'  {domain:<20} {ms:9.3f} ms')
+    scrape = results['scrape']
+    print(f'scrape: {scrape["wall_time_s"]:.2f} s | peak FDs {scrape["peak_fds"]}')
+    for source, rows in scrape['rows'].items():
+        print(f'  {source:<20} {rows} rows')
+    print('verification:')
+    for protocol, verify in results['verify'].items():
+        print(f'  {protocol:<7} {verify["checks_per_s"]:9.1f} checks/s | success {verify["success_rate"]:.1%} | '
+              f'peak FDs {verify["peak_fds"]}')
+    print(f'peak RSS: {results["peak_rss_mb"]:.1f} MB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=200, help='fake proxies per protocol')
+    parser.add_argument('--latency', type=float, default=0.02, help='fake proxy latency, seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.2, help='fake proxy failure probability')
+    parser.add_argument('--checks', type=int, default=2000, help='checks per protocol')
+    parser.add_argument('--limit', type=int, default=500, help='checker concurrency')
+    parser.add_argument('--pages', type=int, default=5, help='hidemy.name pages')
+    parser.add_argument('--hidemy-proxies', type=int, default=20, help='socks4 proxies to scrap hidemy.name')
+    parser.add_argument('--geonode-total', type=int, default=5000, help='geonode.com rows')
+    parser.add_argument('--parse-number', type=int, default=5, help='parse repetitions per page')
+    parser.add_argument('--output', type=Path, help='save results as json to compare between releases')
+    args = parser.parse_args()
+
+    results = main(args)
+    report(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=4))
@@ -0,0 +1,106 @@
+"""
+    Sample pages of sources with the same markup as real websites and random rows.
+    Run `python -m benchmarks.samples` to regenerate files in benchmarks/pages
+"""
+import json
+import random
+from pathlib import Path
+
+PAGES_DIR = Path(Path(__file__).parent, 'pages')
+COUNTRIES = ['Germany', 'United States', 'Brazil', 'Kazakstan', 'Russia', 'Indonesia', 'France', 'China']
+COUNTRY_CODES = ['DE', 'US', 'BR', 'KZ', 'RU', 'ID', 'FR', 'CN']
+
+
+def _ip(rnd: random.Random) -> str:
+    return '.'.join(str(rnd.randint(1, 254)) for _ in range(4))
+
+
+def free_proxy_list(rows: int = 300, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    trs = []
+    for _ in range(rows):
+        code = rnd.choice(COUNTRY_CODES)
+        checked = rnd.choice(['{} secs ago', '{} mins ago', '{} hours ago']).format(rnd.randint(1, 59))
+        trs.append(
+            f'<tr><td>{_ip(rnd)}</td><td>{rnd.randint(80, 65535)}</td><td>{code}</td>'
+            f'<td class="hm">{code} country</td><td>{rnd.choice(["elite proxy", "anonymous", "transparent"])}</td>'
+            f'<td class="hm">no</td><td class="hx">{rnd.choice(["yes", "no"])}</td>'
+            f'<td class="hm">{checked}</td></tr>'
+        )
+    return (
+        '<html><head><title>Free Proxy List</title></head><body><section id="list"><div class="container">'
+        '<div class="table-responsive fpl-list"><table class="table table-striped table-bordered"><thead><tr>'
+        '<th>IP Address</th><th>Port</th><th>Code</th><th class="hm">Country</th><th>Anonymity</th>'
+        '<th class="hm">Google</th><th class="hx">Https</th><th class="hm">Last Checked</th></tr></thead>'
+        f'<tbody>{"".join(trs)}</tbody></table></div></div></section></body></html>'
+    )
+
+
+def hidemy_name(rows: int = 64, last_page: int = 50, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    trs = []
+    for _ in range(rows):
+        checked = rnd.choice(['{} seconds', '{} minutes', '1 h. {} min.']).format(rnd.randint(1, 59))
+        protocols = ', '.join(rnd.sample(['HTTP', 'HTTPS', 'SOCKS4', 'SOCKS5'], rnd.randint(1, 2)))
+        trs.append(
+            f'<tr><td>{_ip(rnd)}</td><td>{rnd.randint(80, 65535)}</td>'
+            f'<td><span class="flag-icon flag-icon-de"></span><span class="country">{rnd.choice(COUNTRIES)}</span>'
+            f'<span class="city">City</span></td>'
+            f'<td><div class="bar"><p>{rnd.randint(100, 5000)} ms</p></div></td>'
+            f'<td>{protocols}</td><td>{rnd.choice(["no", "Low", "Average", "High"])}</td><td>{checked}</td></tr>'
+        )
+    pagination = ''.join(f'<li><a href="/en/proxy-list/?start={i * 64}#list">{i + 1}</a></li>' for i in range(6))
+    return (
+        '<html><head><title>Proxy list</title></head><body><div class="table_block"><table><thead><tr>'
+        '<th>IP address</th><th>Port</th><th>Country, City</th><th>Speed</th><th>Type</th><th>Anonymity</th>'
+        f'<th>Latest update</th></tr></thead><tbody>{"".join(trs)}</tbody></table></div>'
+        f'<div class="pagination"><ul>{pagination}<li>...</li><li><a>{last_page}</a></li>'
+        '<li class="next_array"><a>›</a></li></ul></div></body></html>'
+    )
+
+
+def geonode(limit: int = 500, page: int = 1, total: int = 5000, seed: int = 0) -> dict:
+    rnd = random.Random(seed * 100_000 + page)
+    rows = max(0, min(limit, total - (page - 1) * limit))
+    return {
+        'data': [
+            {
+                'ip': _ip(rnd),
+                'port': str(rnd.randint(80, 65535)),
+                'protocols': rnd.sample(['http', 'https', 'socks4', 'socks5'], 1),
+                'country': rnd.choice(COUNTRY_CODES),
+                'anonymityLevel': rnd.choice(['elite', 'anonymous', 'transparent']),
+                'lastChecked': 1_700_000_000 + rnd.randint(0, 86400),
+            } for _ in range(rows)
+        ],
+        'total': total,
+        'page': page,
+        'limit': limit,
+    }
+
+
+def two_ip_ru(ip: str = '127.0.0.1') -> str:
+    return (
+        '<html><body><div class="ip-info"><div class="ip" id="d_clip_button">'
+        f'<span>{ip}</span></div></div></body></html>'
+    )
+
+
+def load(name: str) -> str:
+    """
+        Saved sample page from benchmarks/pages
+    """
+
+    return Path(PAGES_DIR, name).read_text()
+
+
+def save() -> None:
+    PAGES_DIR.mkdir(exist_ok=True)
+    Path(PAGES_DIR, 'free-proxy-list.net.html').write_text(free_proxy_list())
+    Path(PAGES_DIR, 'hidemy.name.html').write_text(hidemy_name())
+    Path(PAGES_DIR, 'geonode.com.json').write_text(json.dumps(geonode()))
+    Path(PAGES_DIR, '2ip.ru.html').write_text(two_ip_ru())
+
+
+if __name__ == '__main__':
+    save()
@@ -1 +1,4 @@
 from .proxy_master import *
+from .pool import Proxy
+from .scoring import ProxyScore
+from .metrics import start_metrics_server
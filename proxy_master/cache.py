@@ -0,0 +1,83 @@
+import time
+
+# Failed proxy is skipped for `max_age` after first failure, doubled after each next one up to this limit
+NEGATIVE_CACHE_MAX_AGE = 60 * 60 * 24
+
+
+class CheckCache:
+    """
+        Recent results of checks keyed by (proxy, protocol, target). Working proxies are fresh for `max_age`,
+        failed ones get longer backoff with each failure in a row
+    """
+
+    def __init__(self):
+        # (proxy, protocol, target) -> (latency or None if failed, checked_at, failures in a row, anonymity)
+        self._entries: dict[tuple[str, str, str], tuple[float | None, float, int, str | None]] = {}
+        self._updated: set[tuple[str, str, str]] = set()
+
+    @classmethod
+    def from_store(cls, store, protocol: str = None, target: str = None) -> 'CheckCache':
+        """
+            Cache with results saved in ProxyStore, optionally only for one protocol and target
+        """
+
+        cache = cls()
+        for proxy, protocol_, target_, *entry in store.load_checks(protocol, target):
+            cache._entries[proxy, protocol_, target_] = tuple(entry)
+        return cache
+
+    def save(self, store) -> None:
+        """
+            Save results updated since loading to ProxyStore
+        """
+
+        store.save_checks(key + self._entries[key] for key in self._updated)
+        self._updated.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+            self,
+            proxy: str,
+            protocol: str,
+            target: str,
+            max_age: float,
+            now: float = None
+    ) -> tuple[bool, float | None, str | None] | None:
+        """
+            Fresh result as (working, latency, anonymity) or None if proxy should be checked again
+        """
+
+        entry = self._entries.get((proxy, protocol, target))
+        if entry is None:
+            return None
+
+        latency, checked_at, fail_streak, anonymity = entry
+        age = (time.time() if now is None else now) - checked_at
+        if latency is not None:
+            return (True, latency, anonymity) if age <= max_age else None
+        if age <= min(max_age * 2 ** (fail_streak - 1), NEGATIVE_CACHE_MAX_AGE):
+            return False, None, None
+        return None
+
+    def record(
+            self,
+            proxy: str,
+            protocol: str,
+            target: str,
+            latency: float | None,
+            now: float = None,
+            anonymity: str = None
+    ) -> None:
+        """
+            Save result of check, `latency` is None if check failed. `anonymity` is saved if judge detected it
+        """
+
+        key = (proxy, protocol, target)
+        fail_streak = 0
+        if latency is None:
+            previous = self._entries.get(key)
+            fail_streak = previous[2] + 1 if previous else 1
+        self._entries[key] = (latency, time.time() if now is None else now, fail_streak, anonymity)
+        self._updated.add(key)
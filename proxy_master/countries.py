@@ -0,0 +1,85 @@
+"""
+    Country names and codes used by sources resolved to ISO 3166-1 alpha-2 codes.
+    pycountry is imported on first resolution, not with the package
+"""
+import threading
+from functools import lru_cache
+
+# Names used by sources and missing in pycountry or found wrong by its fuzzy search
+ALIASES = {
+    'kazakstan': 'KZ',
+    'russia': 'RU',
+    'south korea': 'KR',
+    'north korea': 'KP',
+    'iran': 'IR',
+    'syria': 'SY',
+    'vietnam': 'VN',
+    'laos': 'LA',
+    'moldova': 'MD',
+    'bolivia': 'BO',
+    'venezuela': 'VE',
+    'tanzania': 'TZ',
+    'taiwan': 'TW',
+    'czech republic': 'CZ',
+    'macedonia': 'MK',
+    'palestine': 'PS',
+    'republic of the congo': 'CG',
+    'dr congo': 'CD',
+    'ivory coast': 'CI',
+    'united kingdom': 'GB',
+    'turkey': 'TR',
+    'kosovo': 'XK',
+}
+# Distinct names not found in table, resolved by slow fuzzy search once
+FUZZY_CACHE_SIZE = 1024
+
+_table: dict[str, str] | None = None
+_table_lock = threading.Lock()
+
+
+def _get_table() -> dict[str, str]:
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                import pycountry
+
+                table = {}
+                for country in pycountry.countries:
+                    for field in ('alpha_2', 'alpha_3', 'name', 'official_name', 'common_name'):
+                        value = getattr(country, field, None)
+                        if value:
+                            table[value.lower()] = country.alpha_2
+                table.update(ALIASES)
+                _table = table
+    return _table
+
+
+@lru_cache(maxsize=FUZZY_CACHE_SIZE)
+def _search_fuzzy(name: str) -> str | None:
+    import pycountry
+
+    try:
+        return pycountry.countries.search_fuzzy(name)[0].alpha_2
+    except LookupError:
+        return None
+
+
+def country_code(value: str | None) -> str | None:
+    """
+        Alpha-2 code of country by its name or alpha-2/alpha-3 code in any case, None if it is unknown
+    """
+
+    if not value:
+        return None
+    key = value.strip().lower()
+    if not key:
+        return None
+
+    code = _get_table().get(key)
+    if code is not None:
+        return code
+    if len(key) == 2 and key.isalpha():
+        # code missing in pycountry, e.g. user-assigned one
+        return key.upper()
+    return _search_fuzzy(key)
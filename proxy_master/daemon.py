@@ -0,0 +1,386 @@
+"""
+    Long-running refresher keeping proxies in memory. Sources are scraped again on their `update_after_min`
+    schedule, proxies are verified continuously and reads never wait for network.
+    Serve them to other services: python -m proxy_master.daemon --port 8898 (or --path /tmp/proxy_master.sock)
+"""
+import time
+import heapq
+import random
+import asyncio
+import argparse
+from contextlib import aclosing
+
+from aiohttp import web
+
+from .pool import ProxyPool
+from .cache import CheckCache
+from .scoring import (
+    PICK_CANDIDATES,
+    Scoreboard,
+)
+from .storage import ProxyStore
+from .proxy_master import (
+    DO_PRINTS,
+    CHECK_CONCURRENCY,
+    CHECK_LIMIT_PER_HOST,
+    WEBSITES_TO_TEST_IP,
+    Judge,
+    Scraper,
+    SessionManager,
+    logger,
+    get_judge,
+    open_store,
+    log_to_console,
+)
+
+# Seconds, working proxies are checked again after this time
+CHECK_INTERVAL = 10 * 60
+# Seconds, pause before retrying sources failed to scrape
+REFRESH_RETRY = 60
+PROTOCOLS = ('http', 'https', 'socks4', 'socks5')
+
+
+class ProxyRefresher:
+    """
+        In-memory pool refreshed in background of running event loop. New pool is built aside and
+        swapped in as a whole, so readers always see complete data. Working proxies of each protocol
+        are updated as soon as their checks finish
+    """
+
+    def __init__(
+            self,
+            store: ProxyStore = None,
+            protocols: tuple[str, ...] = PROTOCOLS,
+            website_protocol: str = 'http',
+            url: str | Judge = WEBSITES_TO_TEST_IP[0],
+            timeout: int = 3,
+            check_interval: float = CHECK_INTERVAL,
+            limit: int = CHECK_CONCURRENCY,
+            limit_per_host: int | None = CHECK_LIMIT_PER_HOST,
+            do_prints: bool = DO_PRINTS,
+    ):
+        self.protocols = protocols
+        self.website_protocol = website_protocol
+        self.judge = get_judge(url)
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.do_prints = do_prints
+
+        self.pool = ProxyPool()
+        self.sources: dict[str, dict] = {}
+        self.scoreboard = Scoreboard()
+        # protocol -> {proxy: latency} of proxies passed the latest check
+        self._working: dict[str, dict[str, float]] = {protocol: {} for protocol in protocols}
+        self._store = store
+        self._own_store = store is None
+        self._cache: CheckCache | None = None
+        self._pool_changed = asyncio.Event()
+        # proxies added or changed by sources since the latest check, they are checked before the next sweep
+        self._pending: set[str] = set()
+        self._next_sweep = 0.
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """
+            Load saved proxies and start background refresh and verification
+        """
+
+        if self._store is None:
+            self._store = open_store()
+        self.scoreboard = Scoreboard.from_store(self._store)
+        self._cache = CheckCache.from_store(self._store, target=self.judge.url(self.website_protocol))
+        self._swap_pool()
+        self._tasks = [
+            asyncio.create_task(self._refresh_loop()),
+            asyncio.create_task(self._verify_loop()),
+        ]
+
+    async def stop(self) -> None:
+        """
+            Stop background tasks and save scores and results of checks
+        """
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._store is not None:
+            self.scoreboard.save(self._store)
+            self._cache.save(self._store)
+            if self._own_store:
+                self._store.close()
+                self._store = None
+
+    async def __aenter__(self) -> 'ProxyRefresher':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    def _swap_pool(self) -> None:
+        self.pool = ProxyPool.from_store(self._store)
+        self.sources = self._store.get_sources()
+        self._pool_changed.set()
+
+    def _next_refresh_in(self) -> float:
+        now = time.time()
+        # source is outdated when more than `update_after_min` whole minutes passed
+        due = min(
+            (data['last_update'] + (data['update_after_min'] + 1) * 60 for data in self.sources.values()),
+            default=now
+        )
+        return max(due - now, REFRESH_RETRY)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                changes = {}
+                if await Scraper.refresh(self._store, do_prints=self.do_prints, changes=changes):
+                    self._swap_pool()
+                    for diff in changes.values():
+                        self._pending.update(diff.added, diff.changed)
+                        for proxy in diff.removed:
+                            # proxy can be still listed by another source
+                            if proxy not in self.pool:
+                                for working in self._working.values():
+                                    working.pop(proxy, None)
+                    logger.info(f'Pool refreshed, {len(self.pool)} proxies') if self.do_prints else ...
+                else:
+                    self.sources = self._store.get_sources()
+            except Exception:
+                logger.exception('Error while refreshing sources') if self.do_prints else ...
+            await asyncio.sleep(self._next_refresh_in())
+
+    async def _verify_loop(self) -> None:
+        while True:
+            self._pool_changed.clear()
+            sweep = time.monotonic() >= self._next_sweep
+            pending, self._pending = self._pending, set()
+            if sweep or pending:
+                for protocol in self.protocols:
+                    try:
+                        await self._verify(protocol, None if sweep else pending)
+                    except Exception:
+                        logger.exception(f'Error while checking {protocol} proxies') if self.do_prints else ...
+                self.scoreboard.save(self._store)
+                self._cache.save(self._store)
+            if sweep:
+                self._next_sweep = time.monotonic() + self.check_interval
+            try:
+                # proxies fresh in cache are not requested again, so sweep is cheap after interval passes
+                await asyncio.wait_for(self._pool_changed.wait(), timeout=self._next_sweep - time.monotonic())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _verify(self, protocol: str, only: set[str] = None) -> None:
+        """
+            Check all proxies of protocol, skipping ones fresh in cache, or only changed proxies from `only`
+        """
+
+        proxies = self.pool.get_proxies_list(protocol=protocol)
+        if only is not None:
+            proxies = [proxy for proxy in proxies if proxy in only]
+            if not proxies:
+                return
+        working = self._working[protocol]
+        checked = set()
+        results = Scraper.iter_test_public_ip(
+            proxies=proxies,
+            proxy_protocol=protocol,
+            website_protocol=self.website_protocol,
+            url=self.judge,
+            timeout=self.timeout,
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            scoreboard=self.scoreboard,
+            cache=self._cache,
+            # changed proxies are checked again regardless of cache
+            max_age=self.check_interval if only is None else None
+        )
+        async with aclosing(results) as results:
+            async for result in results:
+                checked.add(result.proxy)
+                if result.working:
+                    working[result.proxy] = result.latency
+                else:
+                    working.pop(result.proxy, None)
+        if only is None:
+            # proxies removed from pool since previous sweep
+            for proxy in working.keys() - checked:
+                del working[proxy]
+            logger.info(f'{len(working)}/{len(proxies)} {protocol} proxies work') if self.do_prints else ...
+        else:
+            logger.info(f'Checked {len(proxies)} changed {protocol} proxies') if self.do_prints else ...
+
+    def get_proxies(
+            self,
+            protocol: str = None,
+            source: str = None,
+            country: str = None,
+            anonymity: str = None,
+            working: bool = False,
+    ) -> list[str]:
+        """
+            Proxies in format "IP:PORT" based on filters. With `working` only ones passed the latest check
+            for `protocol` (or any protocol), the fastest first
+        """
+
+        proxies = self.pool.get_proxies_list(protocol, source, country, anonymity)
+        if not working:
+            return proxies
+
+        latencies = self._latencies(protocol)
+        return sorted((p for p in proxies if p in latencies), key=latencies.__getitem__)
+
+    def _latencies(self, protocol: str = None) -> dict[str, float]:
+        if protocol:
+            return self._working.get(protocol, {})
+        latencies = {}
+        for working in self._working.values():
+            for proxy, latency in working.items():
+                latencies[proxy] = min(latency, latencies.get(proxy, latency))
+        return latencies
+
+    def _cost(self, proxy: str, protocol: str, latency: float) -> float:
+        score = self.scoreboard.get(proxy, protocol)
+        return latency if score is None else score.cost
+
+    def best(self, protocol: str, n: int = 10) -> list[str]:
+        """
+            `n` working proxies with the lowest expected latency
+        """
+
+        return heapq.nsmallest(
+            n,
+            self._working.get(protocol, {}),
+            key=lambda proxy: self._cost(proxy, protocol, self._working[protocol][proxy])
+        )
+
+    def pick(self, protocol: str) -> str | None:
+        """
+            Random working proxy among PICK_CANDIDATES best ones, faster and more reliable are picked more often
+        """
+
+        candidates = self.best(protocol, PICK_CANDIDATES)
+        if not candidates:
+            return None
+        working = self._working[protocol]
+        weights = [1 / max(self._cost(proxy, protocol, working[proxy]), 1e-6) for proxy in candidates]
+        return random.choices(candidates, weights=weights)[0]
+
+    def status(self) -> dict:
+        return {
+            'proxies': len(self.pool),
+            'working': {protocol: len(working) for protocol, working in self._working.items()},
+            'sources': self.sources,
+        }
+
+
+def create_refresher_app(refresher: ProxyRefresher) -> web.Application:
+    """
+        HTTP API of refresher:
+        GET /proxies?protocol=&source=&country=&anonymity=&working=1 - list of "IP:PORT"
+        GET /best?protocol=&n=10 - list of the best working proxies
+        GET /pick?protocol= - {"proxy": "IP:PORT" or null}
+        GET /status - counts of proxies and sources update times
+    """
+
+    async def proxies(request: web.Request) -> web.Response:
+        query = request.query
+        return web.json_response(refresher.get_proxies(
+            protocol=query.get('protocol'),
+            source=query.get('source'),
+            country=query.get('country'),
+            anonymity=query.get('anonymity'),
+            working=query.get('working', '0') not in ('0', 'false', '')
+        ))
+
+    async def best(request: web.Request) -> web.Response:
+        try:
+            n = int(request.query.get('n', 10))
+        except ValueError:
+            raise web.HTTPBadRequest(text='n must be integer')
+        return web.json_response(refresher.best(request.query.get('protocol', 'http'), n))
+
+    async def pick(request: web.Request) -> web.Response:
+        return web.json_response({'proxy': refresher.pick(request.query.get('protocol', 'http'))})
+
+    async def status(request: web.Request) -> web.Response:
+        return web.json_response(refresher.status())
+
+    app = web.Application()
+    app.router.add_get('/proxies', proxies)
+    app.router.add_get('/best', best)
+    app.router.add_get('/pick', pick)
+    app.router.add_get('/status', status)
+    return app
+
+
+async def start_refresher_server(
+        refresher: ProxyRefresher,
+        host: str = '127.0.0.1',
+        port: int = 8898,
+        path: str = None,
+) -> web.AppRunner:
+    """
+        Serve API of started refresher on `host`:`port` or on unix socket `path`.
+        Call `await runner.cleanup()` to stop it
+    """
+
+    runner = web.AppRunner(create_refresher_app(refresher), access_log=None)
+    await runner.setup()
+    site = web.UnixSite(runner, path) if path else web.TCPSite(runner, host, port)
+    await site.start()
+    return runner
+
+
+async def serve(
+        host: str = '127.0.0.1',
+        port: int = 8898,
+        path: str = None,
+        protocols: tuple[str, ...] = PROTOCOLS,
+        website_protocol: str = 'http',
+        do_prints: bool = DO_PRINTS,
+) -> None:
+    """
+        Run refresher with API until cancelled
+    """
+
+    async with ProxyRefresher(protocols=protocols, website_protocol=website_protocol, do_prints=do_prints) \
+            as refresher:
+        runner = await start_refresher_server(refresher, host, port, path)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+
+def run_refresher_server(
+        host: str = '127.0.0.1',
+        port: int = 8898,
+        path: str = None,
+        protocols: tuple[str, ...] = PROTOCOLS,
+        website_protocol: str = 'http',
+        do_prints: bool = DO_PRINTS,
+) -> None:
+    log_to_console(do_prints)
+    try:
+        asyncio.run(SessionManager.closing(serve(host, port, path, protocols, website_protocol, do_prints)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8898)
+    parser.add_argument('--path', help='unix socket path, instead of host and port')
+    parser.add_argument('--protocols', nargs='+', default=PROTOCOLS)
+    parser.add_argument('--website-protocol', default='http')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+    run_refresher_server(args.host, args.port, args.path, tuple(args.protocols), args.website_protocol,
+                         not args.quiet)
@@ -0,0 +1,43 @@
+"""
+    Lightweight judge server answering with client IP and request headers as json.
+    Check proxies against it with `LocalJudge`: python -m proxy_master.judge --host 0.0.0.0 --port 8899
+"""
+import argparse
+
+from aiohttp import web
+
+
+async def handle(request: web.Request) -> web.Response:
+    return web.json_response({
+        'ip': request.remote,
+        'headers': dict(request.headers),
+    })
+
+
+def create_judge_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handle)
+    return app
+
+
+async def start_judge_server(host: str = '127.0.0.1', port: int = 8899) -> web.AppRunner:
+    """
+        Run judge server in running event loop. Call `await runner.cleanup()` to stop it
+    """
+
+    runner = web.AppRunner(create_judge_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def run_judge_server(host: str = '127.0.0.1', port: int = 8899) -> None:
+    web.run_app(create_judge_app(), host=host, port=port, access_log=None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8899)
+    args = parser.parse_args()
+    run_judge_server(args.host, args.port)
@@ -0,0 +1,209 @@
+"""
+    Low-overhead metrics of requests, scraping, parsing and checks.
+    Subscribe with `METRICS.add_hook(...)` or expose in Prometheus text format with `start_metrics_server()`
+"""
+import time
+import bisect
+from types import SimpleNamespace
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+)
+
+from aiohttp import (
+    web,
+    TraceConfig,
+)
+
+# Seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+PREFIX = 'proxy_master_'
+
+Labels = tuple[tuple[str, str], ...]
+# hook(kind, name, value, labels), kind is one of "histogram", "counter", "gauge"
+Hook = Callable[[str, str, float, dict[str, str]], None]
+Observation = tuple[str, str, float, dict[str, str]]
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+        Histograms, counters and gauges identified by name and labels
+    """
+
+    def __init__(self):
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.gauges: dict[tuple[str, Labels], float] = {}
+        self._hooks: list[Hook] = []
+
+    def add_hook(self, hook: Hook) -> None:
+        """
+            Call `hook(kind, name, value, labels)` on each observation
+        """
+
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        self._hooks.remove(hook)
+
+    def _notify(self, kind: str, name: str, value: float, labels: dict[str, str]) -> None:
+        for hook in self._hooks:
+            hook(kind, name, value, labels)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+        if self._hooks:
+            self._notify('histogram', name, value, labels)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+        if self._hooks:
+            self._notify('counter', name, value, labels)
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        self.gauges[name, tuple(sorted(labels.items()))] = value
+        if self._hooks:
+            self._notify('gauge', name, value, labels)
+
+    def add_gauge(self, name: str, delta: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self.set_gauge(name, self.gauges.get(key, 0) + delta, **labels)
+
+    def merge(self, observations: Iterable[Observation]) -> None:
+        """
+            Apply observations in format of hook arguments, e.g. collected in another process.
+            Values of gauges are changes, so gauges of several processes are summed
+        """
+
+        for kind, name, value, labels in observations:
+            match kind:
+                case 'histogram':
+                    self.observe(name, value, **labels)
+                case 'counter':
+                    self.inc(name, value, **labels)
+                case 'gauge':
+                    self.add_gauge(name, value, **labels)
+
+    def reset(self) -> None:
+        self.histograms.clear()
+        self.counters.clear()
+        self.gauges.clear()
+
+    def render_prometheus(self) -> str:
+        """
+            All metrics in Prometheus text exposition format
+        """
+
+        return ''.join(f'{line}\n' for line in self._iter_prometheus())
+
+    def _iter_prometheus(self) -> Iterator[str]:
+        def format_labels(labels: Labels, extra: Labels = ()) -> str:
+            labels = labels + extra
+            if not labels:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+        for kind, metrics in (('counter', self.counters), ('gauge', self.gauges)):
+            typed = set()
+            for (name, labels), value in sorted(metrics.items()):
+                if name not in typed:
+                    typed.add(name)
+                    yield f'# TYPE {PREFIX}{name} {kind}'
+                yield f'{PREFIX}{name}{format_labels(labels)} {value}'
+
+        typed = set()
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            if name not in typed:
+                typed.add(name)
+                yield f'# TYPE {PREFIX}{name} histogram'
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, '+Inf'), histogram.counts):
+                cumulative += count
+                yield f'{PREFIX}{name}_bucket{format_labels(labels, (("le", str(bound)),))} {cumulative}'
+            yield f'{PREFIX}{name}_sum{format_labels(labels)} {histogram.sum}'
+            yield f'{PREFIX}{name}_count{format_labels(labels)} {histogram.count}'
+
+
+METRICS = Metrics()
+
+
+def create_trace_config(metrics: Metrics = METRICS) -> TraceConfig:
+    """
+        aiohttp tracing of request phases to "request_seconds" histogram. "connect" includes TLS and
+        proxy handshakes, aiohttp doesn't report them separately. "first_byte" is time until response headers
+    """
+
+    async def on_request_start(session, context: SimpleNamespace, params) -> None:
+        context.started = time.perf_counter()
+
+    async def on_dns_resolvehost_start(session, context: SimpleNamespace, params) -> None:
+        context.dns_started = time.perf_counter()
+
+    async def on_dns_resolvehost_end(session, context: SimpleNamespace, params) -> None:
+        metrics.observe('request_seconds', time.perf_counter() - context.dns_started, phase='dns')
+
+    async def on_connection_create_start(session, context: SimpleNamespace, params) -> None:
+        context.connect_started = time.perf_counter()
+
+    async def on_connection_create_end(session, context: SimpleNamespace, params) -> None:
+        metrics.observe('request_seconds', time.perf_counter() - context.connect_started, phase='connect')
+
+    async def on_request_end(session, context: SimpleNamespace, params) -> None:
+        metrics.observe('request_seconds', time.perf_counter() - context.started, phase='first_byte')
+
+    async def on_request_exception(session, context: SimpleNamespace, params) -> None:
+        metrics.inc('request_errors_total', error=type(params.exception).__name__)
+
+    trace_config = TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+async def start_metrics_server(
+        host: str = '127.0.0.1',
+        port: int = 9877,
+        metrics: Metrics = METRICS
+) -> web.AppRunner:
+    """
+        Serve metrics in Prometheus text format on /metrics. Call `await runner.cleanup()` to stop it
+    """
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(
+            body=metrics.render_prometheus().encode(),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        )
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
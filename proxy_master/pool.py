@@ -0,0 +1,172 @@
+import socket
+from collections import defaultdict
+from typing import (
+    Iterable,
+    Iterator,
+)
+
+
+def pack_address(ip: str, port: int | str) -> int:
+    """
+        IPv4 address and port packed in one int, used as key of proxy
+    """
+
+    return int.from_bytes(socket.inet_aton(ip), 'big') << 16 | int(port)
+
+
+class Proxy:
+    """
+        Proxy merged from all sources listing the same ip:port
+    """
+
+    __slots__ = ('key', 'address', 'ip', 'port', 'protocols', 'sources', 'country', 'anonymity', 'last_checked')
+
+    def __init__(self, key: int, ip: str, port: int):
+        self.key = key
+        self.ip = ip
+        self.port = port
+        self.address = f'{ip}:{port}'
+        self.protocols: set[str] = set()
+        self.sources: set[str] = set()
+        self.country: str | None = None
+        self.anonymity: str | None = None
+        self.last_checked: int | None = None
+
+    def __repr__(self) -> str:
+        return f'Proxy({self.address}, protocols={sorted(self.protocols)}, sources={sorted(self.sources)})'
+
+
+class ProxyPool:
+    """
+        In-memory proxies deduplicated by (ip, port) with indexes by protocol, source, country and anonymity.
+        Filtered lookup intersects index sets, starting from the smallest one
+    """
+
+    def __init__(self):
+        self._proxies: dict[int, Proxy] = {}
+        self._indexes: dict[str, defaultdict[str, set[int]]] = {
+            'protocol': defaultdict(set),
+            'source': defaultdict(set),
+            'country': defaultdict(set),
+            'anonymity': defaultdict(set),
+        }
+
+    @classmethod
+    def from_data(cls, data: dict[dict]) -> 'ProxyPool':
+        """
+            Pool from data in format of `Scraper.scrap_or_read()`
+        """
+
+        pool = cls()
+        for domain, website_data in data.items():
+            pool.update(website_data['proxies'], domain)
+        return pool
+
+    @classmethod
+    def from_store(cls, store) -> 'ProxyPool':
+        """
+            Pool from all proxies in ProxyStore
+        """
+
+        pool = cls()
+        for proxy in store.iter_proxies():
+            pool.add(proxy, proxy['source'])
+        return pool
+
+    def __len__(self) -> int:
+        return len(self._proxies)
+
+    def __iter__(self) -> Iterator[Proxy]:
+        return iter(self._proxies.values())
+
+    def __contains__(self, address: str) -> bool:
+        return self.get_proxy(address) is not None
+
+    def get_proxy(self, address: str) -> Proxy | None:
+        """
+            Proxy by "IP:PORT"
+        """
+
+        try:
+            ip, port = address.rsplit(':', 1)
+            return self._proxies.get(pack_address(ip, port))
+        except (OSError, ValueError):
+            return None
+
+    def add(self, proxy: dict, source: str) -> Proxy | None:
+        """
+            Add proxy dict in format of scrapers or merge it to existing one with the same ip:port.
+            Protocols and sources are united, country and anonymity are taken from the latest checked entry
+        """
+
+        try:
+            key = pack_address(proxy['ip'], proxy['port'])
+        except (OSError, ValueError):
+            return None
+
+        record = self._proxies.get(key)
+        if record is None:
+            record = self._proxies[key] = Proxy(key, proxy['ip'], int(proxy['port']))
+
+        for protocol in proxy['protocols']:
+            record.protocols.add(protocol)
+            self._indexes['protocol'][protocol].add(key)
+        record.sources.add(source)
+        self._indexes['source'][source].add(key)
+
+        last_checked = proxy.get('last_checked')
+        if record.last_checked is None or (last_checked is not None and last_checked >= record.last_checked):
+            self._reindex(record, 'country', proxy.get('country'))
+            self._reindex(record, 'anonymity', proxy.get('anonymity'))
+            record.last_checked = last_checked
+        return record
+
+    def update(self, proxies: Iterable[dict], source: str) -> None:
+        for proxy in proxies:
+            self.add(proxy, source)
+
+    def _reindex(self, record: Proxy, field: str, value: str | None) -> None:
+        old = getattr(record, field)
+        if old == value or value is None:
+            return
+        if old is not None:
+            self._indexes[field][old].discard(record.key)
+        self._indexes[field][value].add(record.key)
+        setattr(record, field, value)
+
+    def get(
+            self,
+            protocol: str = None,
+            source: str = None,
+            country: str = None,
+            anonymity: str = None,
+    ) -> list[Proxy]:
+        """
+            Proxies matching all filters
+        """
+
+        filters = [
+            self._indexes[field].get(value, set())
+            for field, value in (('protocol', protocol), ('source', source), ('country', country),
+                                 ('anonymity', anonymity))
+            if value
+        ]
+        if not filters:
+            return list(self._proxies.values())
+
+        filters.sort(key=len)
+        keys = filters[0].intersection(*filters[1:])
+        return [self._proxies[key] for key in keys]
+
+    def get_proxies_list(
+            self,
+            protocol: str = None,
+            source: str = None,
+            country: str = None,
+            anonymity: str = None,
+    ) -> list[str]:
+        """
+            Return list of unique proxies in format "IP:PORT" based on filters
+        """
+
+        return [proxy.address for proxy in self.get(protocol, source, country, anonymity)]
@@ -2,37 +2,200 @@ import re
 import json
 import math
 import time
+import zlib
+import errno
 import asyncio
-import traceback
+import hashlib
+import logging
+import weakref
+import threading
+import multiprocessing
+import importlib.metadata
 from pathlib import Path
+from collections import defaultdict
+from contextlib import (
+    aclosing,
+    asynccontextmanager,
+)
+from queue import Empty
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Iterable,
+    Iterator,
+    NamedTuple,
+)
 
-from bs4 import BeautifulSoup
-import pycountry
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import lxml.html
 from aiohttp import (
+    ClientError,
     ClientSession,
     ClientResponse,
+    TCPConnector,
+)
+from aiohttp_socks import (
+    ProxyError,
+    ProxyConnector,
+    ProxyTimeoutError,
+    ProxyConnectionError,
+)
+
+from .countries import country_code
+from .metrics import (
+    METRICS,
+    create_trace_config,
+)
+from .pool import ProxyPool
+from .cache import CheckCache
+from .scoring import Scoreboard
+from .storage import (
+    DB_FILEPATH,
+    ProxyDiff,
+    ProxyStore,
 )
-from aiohttp_socks import ProxyConnector
 
+# json file used before database, migrated on first run
 FILEPATH = Path(Path.home(), 'proxy_master').with_suffix('.json')
+logger = logging.getLogger('proxy_master')
+logger.addHandler(logging.NullHandler())
 DO_PRINTS: bool = True
 PATTERN_IP_PORT = re.compile(
     r"((([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5])\.){3}([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5]):\d{1,5})"
 )
-# NOTE: settings should be changed here, not in json.
-# Value is the time in minutes after update needed.
-# Some sites don't provide this information, it's my choice
-WEBSITES_WITH_PROXIES = {
-    'free-proxy-list.net': 30,
-    'geonode.com': 60 * 12,
-    # 'openproxy.space': 60,  # host is not working from 16.02.2023-18.02.2023
-    # 'freeproxylists.net': 30, # got 403
-    'hidemy.name': 60 * 24 * 3
-}
+# Group of entry points where other packages expose ProxySource classes or instances
+SOURCES_ENTRY_POINTS = 'proxy_master.sources'
+# Default pages of source fetched at once and retries with exponential backoff for failed ones
+PAGES_CONCURRENCY = 8
+PAGE_RETRIES = 3
+RETRY_BACKOFF = 1
+# Workers crawling pages through proxies, each of them is bound to one proxy at a time
+CRAWL_WORKERS = 32
+# Attempts of page failing through working proxies, e.g. with empty table, before it is reported missing
+CRAWL_PAGE_ATTEMPTS = 3
+# Threads parsing html outside of event loop
+PARSE_WORKERS = 4
 WEBSITES_TO_TEST_IP = [
     'icanhazip.com',
     '2ip.ru'
 ]
+# Headers added by proxies which are not elite
+PROXY_HEADERS = {
+    'via', 'forwarded', 'x-forwarded-for', 'x-forwarded-host', 'x-forwarded-proto', 'x-real-ip',
+    'client-ip', 'x-client-ip', 'x-proxy-id', 'proxy-connection', 'x-originating-ip',
+}
+# How many proxy checks can be in flight at once and how many of them can go through the same proxy IP.
+# Without limits every check opens sockets at the same moment and most of "failures" are local timeouts
+CHECK_CONCURRENCY = 500
+CHECK_LIMIT_PER_HOST = 8
+# Proxies are probed by TCP connect (and SOCKS5 greeting) with this timeout in seconds before full check,
+# it leaves time for one retransmission of lost SYN. Much more probes than checks are in flight,
+# as each of them holds socket only until it connects
+PREFILTER_TIMEOUT = 1.5
+PREFILTER_CONCURRENCY = 1000
+# Seconds the parent of sharded check waits for results at once, before it checks workers are alive
+SHARD_POLL_INTERVAL = 0.5
+# Direct connections are kept alive between requests
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 30
+
+
+class CheckResult(NamedTuple):
+    """
+        Result of testing one proxy. Latency of request through proxy is in seconds,
+        anonymity is detected only by judges reporting headers.
+        New fields are appended, so read them by name rather than unpacking
+    """
+    proxy: str
+    working: bool
+    latency: float | None = None
+    cached: bool = False
+    anonymity: str | None = None
+
+
+class SessionManager:
+    """
+        Long-lived aiohttp sessions, one set per running event loop, so threads running
+        their own loops don't share them. Direct requests share one pooled keep-alive TCPConnector,
+        http(s) proxied ones share connector closing connection after request,
+        socks proxies get one-off session closed after request
+    """
+
+    _direct: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ClientSession]' = weakref.WeakKeyDictionary()
+    _proxied: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ClientSession]' = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_shared(
+            cls,
+            sessions: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ClientSession]',
+            keepalive: bool
+    ) -> ClientSession:
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            session = sessions.get(loop)
+            if session is None or session.closed:
+                session = sessions[loop] = ClientSession(
+                    connector=TCPConnector(
+                        # concurrency is limited by callers
+                        limit=0,
+                        ttl_dns_cache=DNS_CACHE_TTL,
+                        keepalive_timeout=KEEPALIVE_TIMEOUT if keepalive else None,
+                        force_close=not keepalive
+                    ),
+                    trace_configs=[create_trace_config()]
+                )
+            return session
+
+    @classmethod
+    @asynccontextmanager
+    async def session(cls, proxy: str = None) -> AsyncIterator[ClientSession]:
+        """
+            Shared session to send request directly or through `proxy` in format "PROTOCOL://IP:PORT"
+        """
+
+        if not proxy:
+            yield cls._get_shared(cls._direct, keepalive=True)
+            return
+        # proxy is usually checked once per sweep, keeping its connection alive would only hold socket
+        if not proxy.startswith('socks'):
+            yield cls._get_shared(cls._proxied, keepalive=False)
+            return
+
+        session = ClientSession(
+            connector=ProxyConnector.from_url(proxy, force_close=True),
+            trace_configs=[create_trace_config()]
+        )
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    @classmethod
+    async def close(cls) -> None:
+        """
+            Close sessions of the running event loop
+        """
+
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            sessions = [cls._direct.pop(loop, None), cls._proxied.pop(loop, None)]
+        await asyncio.gather(*(s.close() for s in sessions if s is not None), return_exceptions=True)
+
+    @classmethod
+    async def closing(cls, coro: Coroutine) -> Any:
+        """
+            Await coroutine and close sessions after it. Useful as `asyncio.run(SessionManager.closing(...))`
+        """
+
+        try:
+            return await coro
+        finally:
+            await cls.close()
 
 
 class DataHandler:
@@ -40,12 +203,16 @@ class DataHandler:
     def get_proxies_list(
             data: dict[dict],
             protocol: str = None,
-            source: str = None
+            source: str = None,
+            unique: bool = False
     ) -> list[str]:
         """
             Return list of proxies in format "IP:PORT" based on filters
         """
 
+        if unique:
+            return DataHandler.get_proxy_pool(data).get_proxies_list(protocol=protocol, source=source)
+
         proxies = []
         for domain, website_data in data.items():
             if source and source != domain:
@@ -59,6 +226,247 @@ class DataHandler:
 
         return proxies
 
+    @staticmethod
+    def get_proxy_pool(data: dict[dict]) -> ProxyPool:
+        """
+            Proxies of all domains merged by ip:port into ProxyPool
+        """
+
+        return ProxyPool.from_data(data)
+
+
+class ProxyTableNotFound(ValueError):
+    """ Page has no table of proxies, e.g. captcha, block or changed layout """
+
+
+def _table_rows(html: str) -> list:
+    # page without table mustn't look like source without proxies
+    tables = lxml.html.fromstring(html).xpath('(//table)[1]')
+    if not tables:
+        raise ProxyTableNotFound('no proxy table')
+    return tables[0].xpath('./tbody/tr')
+
+
+def _has_class(name: str) -> str:
+    """ XPath condition matching element with css class `name` """
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+class Parser:
+    """
+        Parsers of websites html based on lxml XPath. Called through `Parser.run(...)` they work
+        in thread pool, so event loop doesn't block while hundreds of requests are waiting
+    """
+
+    _executor: ThreadPoolExecutor | None = None
+
+    @classmethod
+    async def run(cls, func: Callable, *args, **kwargs) -> Any:
+        """
+            Run parser in thread pool of PARSE_WORKERS threads
+        """
+
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix='proxy_master_parser')
+        result, error, elapsed = await asyncio.get_running_loop().run_in_executor(
+            cls._executor, partial(cls._timed, func, *args, **kwargs)
+        )
+        # metrics and their hooks aren't thread-safe, so they are updated here on event loop thread
+        METRICS.observe('parse_seconds', elapsed, parser=getattr(func, '__qualname__', 'parser'))
+        if error is not None:
+            raise error
+        return result
+
+    @staticmethod
+    def _timed(func: Callable, *args, **kwargs) -> tuple[Any, Exception | None, float]:
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs), None, time.perf_counter() - started
+        except Exception as ex:
+            return None, ex, time.perf_counter() - started
+
+    @staticmethod
+    def two_ip_ru(html: str) -> str | None:
+        """
+            Public IP from 2ip.ru main page
+        """
+
+        spans = lxml.html.fromstring(html).xpath(f'//div[{_has_class("ip")}]//span')
+        return spans[0].text_content() if spans else None
+
+    @staticmethod
+    def free_proxy_list(html: str, do_prints: bool = DO_PRINTS) -> list[dict]:
+        """
+            Proxies from table of free-proxy-list.net
+        """
+
+        proxies = []
+        for tr in _table_rows(html):
+            tds = [td.text_content() for td in tr.xpath('.//td')]
+            proxy = {
+                'ip': tds[0],
+                'port': tds[1],
+                'protocols': ['https'] if tds[-2] == 'yes' else ['http'],
+                'country': country_code(tds[2]),
+                'anonymity': tds[4].replace(' proxy', ''),
+            }
+
+            last_checked_lst = tds[-1].split()
+            if last_checked_lst[1].startswith('sec'):
+                proxy['last_checked'] = int(time.time()) - int(last_checked_lst[0])
+            elif last_checked_lst[1].startswith('min'):
+                proxy['last_checked'] = int(time.time()) - int(last_checked_lst[0]) * 60
+            elif last_checked_lst[1].startswith('hour'):
+                proxy['last_checked'] = int(time.time()) - int(last_checked_lst[0]) * 3600
+            else:
+                logger.warning(f'Unexpected time metric in row: {tds[-1]} | domain=free-proxy-list.net') if do_prints else ...
+
+            proxies.append(proxy)
+        return proxies
+
+    @staticmethod
+    def hidemy_name_last_page(html: str) -> int:
+        """
+            Number of last page from pagination of hidemy.name
+        """
+
+        return int(lxml.html.fromstring(html).xpath(f'(//div[{_has_class("pagination")}])[1]//li')[-2].text_content())
+
+    @staticmethod
+    def hidemy_name(html: str, do_prints: bool = DO_PRINTS) -> list[dict]:
+        """
+            Proxies from table of hidemy.name
+        """
+
+        proxies = []
+        for tr in _table_rows(html):
+            tds = tr.xpath('.//td')
+            texts = [td.text_content() for td in tds]
+            proxy_data = {
+                'ip': texts[0],
+                'port': texts[1],
+                'protocols': [x.lower().strip() for x in texts[4].split(',')],
+                'country': ...,
+                'anonymity': ...,
+                'last_checked': ...,
+            }
+
+            proxy_data['country'] = country_code(tds[2].xpath(f'.//span[{_has_class("country")}]')[0].text_content())
+
+            match texts[-2].lower():
+                case 'no':
+                    proxy_data['anonymity'] = 'transparent'
+                case 'low' | 'average':
+                    proxy_data['anonymity'] = 'anonymous'
+                case 'high':
+                    proxy_data['anonymity'] = 'elite'
+                case _:
+                    logger.warning(f'Unexpected anonymity type in row: {texts[-2]} | domain=hidemy.name') if do_prints else ...
+
+            match texts[-1].split():
+                case n_seconds, 'seconds':
+                    proxy_data['last_checked'] = int(time.time()) - (int(n_seconds))
+                case n_minutes, 'minutes':
+                    proxy_data['last_checked'] = int(time.time()) - (int(n_minutes) * 60)
+                case n_hours, 'h.', n_minutes, 'min.':
+                    proxy_data['last_checked'] = int(time.time() - (int(n_hours) * 3600 + int(n_minutes) * 60))
+                case _:
+                    logger.warning(f'Unexpected time metric in row: {texts[-1]} | domain=hidemy.name') if do_prints else ...
+            proxies.append(proxy_data)
+        return proxies
+
+
+class JudgeAnswer(NamedTuple):
+    """ Public IP seen by judge and request headers, if judge reports them """
+    ip: str | None
+    headers: dict[str, str] | None = None
+
+
+class Judge:
+    """
+        Website answering with public IP of client. Subclass it to check proxies against own endpoint
+    """
+
+    # html answers are parsed in Parser thread pool
+    parse_in_thread: bool = False
+    # judge answers with request headers, so anonymity of proxy can be detected
+    reports_headers: bool = False
+
+    def url(self, website_protocol: str) -> str:
+        raise NotImplementedError
+
+    def parse(self, text: str) -> JudgeAnswer:
+        raise NotImplementedError
+
+    @staticmethod
+    def get_anonymity(headers: dict[str, str], real_ip: str | None) -> str:
+        """
+            "transparent" if real IP leaked to headers, "anonymous" if proxy headers are present, else "elite"
+        """
+
+        if real_ip and any(real_ip in value for header, value in headers.items() if header.lower() != 'host'):
+            return 'transparent'
+        if any(header.lower() in PROXY_HEADERS for header in headers):
+            return 'anonymous'
+        return 'elite'
+
+
+class IcanhazipJudge(Judge):
+    def url(self, website_protocol: str) -> str:
+        return f'{website_protocol}://icanhazip.com'
+
+    def parse(self, text: str) -> JudgeAnswer:
+        return JudgeAnswer(text.strip())
+
+
+class TwoIpRuJudge(Judge):
+    parse_in_thread = True
+
+    def url(self, website_protocol: str) -> str:
+        return f'{website_protocol}://2ip.ru'
+
+    def parse(self, text: str) -> JudgeAnswer:
+        return JudgeAnswer(Parser.two_ip_ru(text))
+
+
+class LocalJudge(Judge):
+    """
+        Judge server bundled with package (`python -m proxy_master.judge`) or any other endpoint
+        answering with json {"ip": ..., "headers": {...}}. `address` is "HOST:PORT/PATH" without protocol
+    """
+
+    reports_headers = True
+
+    def __init__(self, address: str = '127.0.0.1:8899/'):
+        self.address = address
+
+    def url(self, website_protocol: str) -> str:
+        return f'{website_protocol}://{self.address}'
+
+    def parse(self, text: str) -> JudgeAnswer:
+        data = json.loads(text)
+        return JudgeAnswer(data['ip'], data['headers'])
+
+
+JUDGES: dict[str, Judge] = {
+    'icanhazip.com': IcanhazipJudge(),
+    '2ip.ru': TwoIpRuJudge(),
+}
+
+
+def get_judge(url: str | Judge) -> Judge:
+    """
+        Judge instance or one of built-in judges by domain from WEBSITES_TO_TEST_IP
+    """
+
+    if isinstance(url, Judge):
+        return url
+
+    assert url in JUDGES, \
+        f'Unavailable to check ip address from {url}\n' \
+        f'Use one of this websites: {WEBSITES_TO_TEST_IP} or Judge instance'
+    return JUDGES[url]
+
 
 class Scraper:
     @staticmethod
@@ -70,13 +478,26 @@ class Scraper:
             headers: dict = None,
             params: dict = None,
             json_: dict = None,
-            timeout: int = 3
+            timeout: int = 3,
+            response_headers: dict = None,
     ) -> str | dict | ClientResponse:
         """
-            Send asynchronously request using one of aiohttp.ClientSession method
+            Send asynchronously request using one of aiohttp.ClientSession method.
+            Session is taken from SessionManager, unless custom `connector` passed.
+            `proxy` can be http(s) or socks url. Headers of response are saved to `response_headers`
+            if passed, names in lower case
         """
 
-        async with ClientSession(connector=connector) as session:
+        if connector is not None:
+            session_context = ClientSession(connector=connector)
+        else:
+            session_context = SessionManager.session(proxy)
+            if proxy and proxy.startswith('socks'):
+                # proxy is already set in session connector
+                proxy = None
+
+        started = time.perf_counter()
+        async with session_context as session:
             async with session.get(
                     url=url,
                     proxy=proxy,
@@ -85,405 +506,1259 @@ class Scraper:
                     params=params,
                     timeout=timeout
             ) as response:
+                if response_headers is not None:
+                    response_headers.update((name.lower(), value) for name, value in response.headers.items())
                 match response.status:
                     case 200:
                         match response_type:
                             case 'text':
-                                return str(await response.text())
+                                result = str(await response.text())
                             case 'json':
-                                return await response.json()
+                                result = await response.json()
+                            case _:
+                                result = None
                     case _:
-                        return response
+                        result = response
+        METRICS.observe('request_seconds', time.perf_counter() - started, phase='total')
+        return result
+
+    @staticmethod
+    async def send_request_with_retries(
+            retries: int = PAGE_RETRIES,
+            backoff: float = RETRY_BACKOFF,
+            limiter: 'RateLimiter' = None,
+            **kwargs
+    ) -> str | dict | ClientResponse:
+        """
+            Send request and repeat it with exponential backoff on exception or unexpected status.
+            Each attempt waits for `limiter` if passed.
+            Raise last exception or return last response if all attempts failed
+        """
+
+        for attempt in range(retries + 1):
+            try:
+                if limiter is not None:
+                    await limiter.wait()
+                response = await Scraper.send_request(**kwargs)
+                if not isinstance(response, ClientResponse):
+                    return response
+            except Exception:
+                if attempt == retries:
+                    raise
+            if attempt < retries:
+                await asyncio.sleep(backoff * 2 ** attempt)
+        return response
+
+    @staticmethod
+    async def _ask_judge(judge: Judge, website_protocol: str, proxy: str = None, timeout: int = 3) -> JudgeAnswer:
+        """
+            Request judge directly or through proxy in format "PROTOCOL://IP:PORT"
+        """
+
+        result = await Scraper.send_request(
+            response_type='text',
+            url=judge.url(website_protocol),
+            proxy=proxy,
+            timeout=timeout
+        )
+        if not isinstance(result, str):
+            return JudgeAnswer(None)
+        if judge.parse_in_thread:
+            return await Parser.run(judge.parse, result)
+        return judge.parse(result)
+
+    @staticmethod
+    async def _check_proxy(
+            proxy: str,
+            proxy_protocol: str,
+            website_protocol: str,
+            judge: Judge,
+            timeout: int,
+            real_ip: str = None
+    ) -> CheckResult:
+        """
+            Request public IP through proxy and compare it with proxy IP
+        """
+
+        started = time.perf_counter()
+        try:
+            answer = await Scraper._ask_judge(judge, website_protocol, f'{proxy_protocol}://{proxy}', timeout)
+        except Exception:
+            return CheckResult(proxy, False)
+        latency = time.perf_counter() - started
+
+        if answer.ip != proxy.split(':')[0]:
+            return CheckResult(proxy, False)
+        anonymity = Judge.get_anonymity(answer.headers, real_ip) if answer.headers is not None else None
+        return CheckResult(proxy, True, latency, anonymity=anonymity)
+
+    @staticmethod
+    async def iter_test_public_ip(
+            proxies: list,
+            proxy_protocol: str,
+            website_protocol: str,
+            url: str | Judge = 'icanhazip.com',
+            timeout: int = 3,
+            limit: int = CHECK_CONCURRENCY,
+            limit_per_host: int | None = CHECK_LIMIT_PER_HOST,
+            scoreboard: Scoreboard = None,
+            cache: CheckCache = None,
+            max_age: float = None,
+            processes: int = None,
+            prefilter: float | None = PREFILTER_TIMEOUT,
+    ) -> AsyncIterator[CheckResult]:
+        """
+            Test proxies with at most `limit` checks in flight and at most `limit_per_host` checks
+            through the same proxy IP. Yield results in order of completion.
+            Each result is recorded to `scoreboard` and `cache` if passed. With `max_age` results
+            from cache fresher than it are yielded first, without request.
+            With `processes` > 1 proxies are checked by that many processes, `limit` is applied to each of them.
+            Proxies not accepting connection in `prefilter` seconds fail without full check, None disables probe
+        """
+
+        judge = get_judge(url)
+        target = judge.url(website_protocol)
+        proxies = list(proxies)
+        if cache is not None and max_age is not None:
+            now = time.time()
+            to_check = []
+            for proxy in proxies:
+                cached = cache.get(proxy, proxy_protocol, target, max_age, now)
+                if cached is None:
+                    to_check.append(proxy)
+                else:
+                    METRICS.inc('checks_total', protocol=proxy_protocol, result='cached')
+                    working, latency, anonymity = cached
+                    yield CheckResult(proxy, working, latency, cached=True, anonymity=anonymity)
+            proxies = to_check
+
+        real_ip = None
+        if judge.reports_headers and proxies:
+            # own IP to detect transparent proxies
+            try:
+                real_ip = (await Scraper._ask_judge(judge, website_protocol, timeout=timeout)).ip
+            except Exception:
+                pass
+
+        if prefilter is not None:
+            prefilter = min(prefilter, timeout)
+        if processes and processes > 1:
+            checked = Scraper._iter_test_sharded(
+                proxies, proxy_protocol, website_protocol, judge, timeout, limit, limit_per_host, real_ip, processes,
+                prefilter
+            )
+        else:
+            checked = Scraper._iter_test_bounded(
+                proxies, proxy_protocol, website_protocol, judge, timeout, limit, limit_per_host, real_ip, prefilter
+            )
+
+        async with aclosing(checked):
+            async for result in checked:
+                METRICS.inc('checks_total', protocol=proxy_protocol, result='working' if result.working else 'failed')
+                if scoreboard is not None:
+                    scoreboard.record(result.proxy, proxy_protocol, result.latency)
+                if cache is not None:
+                    cache.record(result.proxy, proxy_protocol, target, result.latency, anonymity=result.anonymity)
+                yield result
+
+    @staticmethod
+    async def _iter_test_bounded(
+            proxies: list,
+            proxy_protocol: str,
+            website_protocol: str,
+            judge: Judge,
+            timeout: int,
+            limit: int,
+            limit_per_host: int | None,
+            real_ip: str | None = None,
+            prefilter: float | None = None,
+    ) -> AsyncIterator[CheckResult]:
+        """
+            Check proxies by `limit` workers in running event loop, yield results in order of completion.
+            With `prefilter` proxies are probed by up to PREFILTER_CONCURRENCY workers first and passed ones
+            are checked as soon as they pass
+        """
+
+        proxies_iter = iter(proxies)
+        results = asyncio.Queue()
+        hosts = defaultdict(lambda: asyncio.Semaphore(limit_per_host)) if limit_per_host else None
+        checkers = min(limit, len(proxies))
+
+        if prefilter is None:
+            async def next_proxy() -> str | None:
+                return next(proxies_iter, None)
+
+            probers = []
+        else:
+            passed = asyncio.Queue()
+
+            async def next_proxy() -> str | None:
+                return await passed.get()
+
+            probed_hosts = defaultdict(lambda: asyncio.Semaphore(limit_per_host)) if limit_per_host else None
+
+            async def probe(proxy: str) -> bool:
+                if probed_hosts is None:
+                    return await Scraper._probe_proxy(proxy, proxy_protocol, prefilter)
+                # burst of connections to one host can overflow its accept queue
+                async with probed_hosts[proxy.split(':')[0]]:
+                    return await Scraper._probe_proxy(proxy, proxy_protocol, prefilter)
+
+            async def prober() -> None:
+                # all probers share one iterator, so every proxy is probed exactly once
+                for proxy in proxies_iter:
+                    if await probe(proxy):
+                        METRICS.inc('prefilter_total', protocol=proxy_protocol, result='passed')
+                        passed.put_nowait(proxy)
+                    else:
+                        METRICS.inc('prefilter_total', protocol=proxy_protocol, result='failed')
+                        results.put_nowait(CheckResult(proxy, False))
+
+            async def probe_all() -> None:
+                probers_count = min(_probe_concurrency(checkers), len(proxies))
+                await asyncio.gather(*(prober() for _ in range(probers_count)))
+                # all probes are done, stop checkers
+                for _ in range(checkers):
+                    passed.put_nowait(None)
+
+            probers = [asyncio.create_task(probe_all())]
+
+        async def worker() -> None:
+            # all workers take proxies from one source, so every proxy is taken exactly once
+            while (proxy := await next_proxy()) is not None:
+                METRICS.add_gauge('checks_in_flight', 1)
+                try:
+                    if hosts is None:
+                        result = await Scraper._check_proxy(
+                            proxy, proxy_protocol, website_protocol, judge, timeout, real_ip
+                        )
+                    else:
+                        async with hosts[proxy.split(':')[0]]:
+                            result = await Scraper._check_proxy(
+                                proxy, proxy_protocol, website_protocol, judge, timeout, real_ip
+                            )
+                finally:
+                    METRICS.add_gauge('checks_in_flight', -1)
+                results.put_nowait(result)
+
+        workers = probers + [asyncio.create_task(worker()) for _ in range(checkers)]
+        try:
+            for _ in range(len(proxies)):
+                yield await results.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    @staticmethod
+    async def _probe_proxy(proxy: str, proxy_protocol: str, timeout: float) -> bool:
+        """
+            Cheap check if proxy accepts TCP connection and, for socks5, answers greeting without authentication
+        """
+
+        try:
+            ip, port = proxy.rsplit(':', 1)
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, int(port)), timeout)
+        except OSError as ex:
+            # out of file descriptors says nothing about proxy, full check decides then
+            return ex.errno in (errno.EMFILE, errno.ENFILE)
+        except (asyncio.TimeoutError, ValueError):
+            return False
+
+        try:
+            if proxy_protocol == 'socks5':
+                # version 5, one method: no authentication
+                writer.write(b'\x05\x01\x00')
+                await writer.drain()
+                return await asyncio.wait_for(reader.readexactly(2), timeout) == b'\x05\x00'
+            return True
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return False
+        finally:
+            writer.close()
+            # descriptor is released only when transport is closed, next probe mustn't open one before it
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    @staticmethod
+    async def _iter_test_sharded(
+            proxies: list,
+            proxy_protocol: str,
+            website_protocol: str,
+            judge: Judge,
+            timeout: int,
+            limit: int,
+            limit_per_host: int | None,
+            real_ip: str | None,
+            processes: int,
+            prefilter: float | None = None,
+    ) -> AsyncIterator[CheckResult]:
+        """
+            Split proxies by IP between `processes` worker processes, each of them checks own shard
+            in own bounded event loop. Yield results of all workers in order of completion
+        """
+
+        shards = [[] for _ in range(processes)]
+        for proxy in proxies:
+            # the same IP always goes to the same shard, so limit_per_host stays global
+            shards[zlib.crc32(proxy.split(':')[0].encode()) % processes].append(proxy)
+
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        workers = [
+            context.Process(
+                target=_test_shard,
+                args=(
+                    shard,
+                    (proxy_protocol, website_protocol, judge, timeout, limit, limit_per_host, real_ip, prefilter),
+                    queue
+                ),
+                daemon=True
+            ) for shard in shards if shard
+        ]
+        for worker in workers:
+            worker.start()
+
+        def get_items() -> list:
+            # blocking read is bounded, so the thread is freed if generator is closed or worker is killed
+            try:
+                items = [queue.get(timeout=SHARD_POLL_INTERVAL)]
+            except Empty:
+                return []
+            # take everything already received without switching to thread again
+            try:
+                while True:
+                    items.append(queue.get_nowait())
+            except Empty:
+                pass
+            return items
+
+        loop = asyncio.get_running_loop()
+        finished = 0
+        getter = None
+        try:
+            while finished < len(workers):
+                # results of workers exited before the read are all in queue already
+                alive = any(worker.is_alive() for worker in workers)
+                getter = loop.run_in_executor(None, get_items)
+                # on cancel thread is still reading, it is awaited below before queue is closed
+                items = await asyncio.shield(getter)
+                if not items and not alive:
+                    # worker was killed without reporting the end, e.g. by OOM killer
+                    logger.error(f'{len(workers) - finished} check shards exited unexpectedly')
+                    break
+
+                for item in items:
+                    if item is None:
+                        finished += 1
+                        continue
+                    result, observations = item
+                    METRICS.merge(observations)
+                    if result is not None:
+                        yield CheckResult(*result)
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+            if getter is not None and not getter.done():
+                # wake up the thread still reading queue
+                queue.put(None)
+                await asyncio.gather(getter, return_exceptions=True)
+            queue.close()
+
+    @staticmethod
+    async def iter_working_proxies(
+            proxies: list,
+            proxy_protocol: str,
+            website_protocol: str,
+            url: str | Judge = 'icanhazip.com',
+            timeout: int = 3,
+            limit: int = CHECK_CONCURRENCY,
+            limit_per_host: int | None = CHECK_LIMIT_PER_HOST,
+            scoreboard: Scoreboard = None,
+            cache: CheckCache = None,
+            max_age: float = None,
+            processes: int = None,
+            prefilter: float | None = PREFILTER_TIMEOUT,
+    ) -> AsyncIterator[CheckResult]:
+        """
+            Yield working proxies with latency as soon as each of them passes the check
+        """
+
+        async for result in Scraper.iter_test_public_ip(
+                proxies=proxies,
+                proxy_protocol=proxy_protocol,
+                website_protocol=website_protocol,
+                url=url,
+                timeout=timeout,
+                limit=limit,
+                limit_per_host=limit_per_host,
+                scoreboard=scoreboard,
+                cache=cache,
+                max_age=max_age,
+                processes=processes,
+                prefilter=prefilter
+        ):
+            if result.working:
+                yield result
 
     @staticmethod
     async def test_public_ip(
             proxies: list,
             proxy_protocol: str,
             website_protocol: str,
-            url: str = 'icanhazip.com',
+            url: str | Judge = 'icanhazip.com',
             timeout: int = 3,
             do_prints: bool = DO_PRINTS,
+            limit: int = CHECK_CONCURRENCY,
+            limit_per_host: int | None = CHECK_LIMIT_PER_HOST,
+            scoreboard: Scoreboard = None,
+            cache: CheckCache = None,
+            max_age: float = None,
+            processes: int = None,
+            prefilter: float | None = PREFILTER_TIMEOUT,
     ) -> list:
 
-        assert url in WEBSITES_TO_TEST_IP, \
-            f'Unavailable to check ip address from {url}\n' \
-            f'Use one of this websites: {WEBSITES_TO_TEST_IP}'
-
         working_proxies = []
-        tasks = [
-            asyncio.create_task(
-                Scraper.send_request(
-                    response_type='text',
-                    url=f'{website_protocol}://{url}',
-                    proxy=f'{proxy_protocol}://{proxy}' if proxy_protocol in ('http', 'https') else None,
-                    connector=ProxyConnector.from_url(f'{proxy_protocol}://{proxy}')
-                    if proxy_protocol in ('socks4', 'socks5') else None,
-                    timeout=timeout
-                )
-            ) for proxy in proxies
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        for proxy, result in zip(proxies, results):
-            if isinstance(result, str):
-                match url:
-                    case 'icanhazip.com':
-                        public_ip = result.strip()
-                    case '2ip.ru':
-                        public_ip = BeautifulSoup(result, 'lxml').find('div', class_='ip', ).find('span').text
-                    case _:
-                        public_ip = None
-
-                if public_ip == proxy.split(':')[0]:
-                    print(f'Working! Proxy: {proxy}') if do_prints else ...
-                    working_proxies.append(proxy)
+        async for result in Scraper.iter_test_public_ip(
+                proxies=proxies,
+                proxy_protocol=proxy_protocol,
+                website_protocol=website_protocol,
+                url=url,
+                timeout=timeout,
+                limit=limit,
+                limit_per_host=limit_per_host,
+                scoreboard=scoreboard,
+                cache=cache,
+                max_age=max_age,
+                processes=processes,
+                prefilter=prefilter
+        ):
+            if result.working:
+                logger.info(f'Working! Proxy: {result.proxy}') if do_prints else ...
+                working_proxies.append(result.proxy)
 
-        print(f'{len(working_proxies)}/{len(proxies)} proxies works') if do_prints else ...
+        logger.info(f'{len(working_proxies)}/{len(proxies)} proxies works') if do_prints else ...
         return working_proxies
 
     @staticmethod
-    async def _scrap_website(
-            domain: str,
-            data: dict[dict],
-            do_prints: bool = DO_PRINTS
-    ) -> list[dict]:
+    async def _crawl_pages(
+            pages: list[int],
+            proxies: list[str],
+            fetch_page: Callable[[int, str], Coroutine[Any, Any, list[int]]],
+            workers: int = CRAWL_WORKERS,
+            page_attempts: int = CRAWL_PAGE_ATTEMPTS,
+    ) -> list[int]:
+        """
+            Crawl pages through proxies. Each worker takes proxy and fetches pages from shared queue with it,
+            until proxy fails: then page is returned to queue and proxy is dropped for the next spare one.
+            `fetch_page(page, proxy)` returns new pages to crawl, raises ConnectionError if proxy failed
+            and other exception if page failed through working proxy. Such page is retried `page_attempts` times.
+            Return pages not crawled when proxies ran out or attempts of page were exhausted
+        """
 
-        proxies = []
-        match domain:
-            case 'free-proxy-list.net':
-                response: str = await Scraper.send_request(
-                    url=f'https://free-proxy-list.net',
-                    response_type='text'
-                )
+        queue = asyncio.Queue()
+        for page in pages:
+            queue.put_nowait(page)
+        left = len(pages)
+        if not left:
+            return []
+        spare_proxies = iter(proxies)
+        done = asyncio.Event()
+        failures = defaultdict(int)
+        given_up = []
 
-                for tr in BeautifulSoup(response, 'lxml').table.tbody.find_all('tr'):
-                    tds = tr.find_all('td')
-                    proxy = {
-                        'ip': tds[0].text,
-                        'port': tds[1].text,
-                        'protocols': ['https'] if tds[-2].text == 'yes' else ['http'],
-                        'country': tds[2].text,
-                        'anonymity': tds[4].text.replace(' proxy', ''),
-                    }
-
-                    last_checked_lst = tds[-1].text.split()
-                    if last_checked_lst[1].startswith('sec'):
-                        proxy['last_checked'] = int(time.time()) - int(last_checked_lst[0])
-                    elif last_checked_lst[1].startswith('min'):
-                        proxy['last_checked'] = int(time.time()) - int(last_checked_lst[0]) * 60
-                    elif last_checked_lst[1].startswith('hour'):
-                        proxy['last_checked'] = int(time.time()) - int(last_checked_lst[0]) * 3600
-                    else:
-                        print(f'Unexpected time metric in row: {tds[-1].text} | {domain=}') if do_prints else ...
-
-                    proxies.append(proxy)
-            case 'geonode.com':
-                params = {
-                    "limit": 1,
-                    "page": 1,
-                    "sort_by": "",
-                    "sort_type": "",
-                    "protocols": '',
-                }
-                response: dict = await Scraper.send_request(
-                    url='https://proxylist.geonode.com/api/proxy-list',
-                    response_type='json',
-                    params=params,
+        async def worker() -> None:
+            nonlocal left
+            for proxy in spare_proxies:
+                while True:
+                    page = await queue.get()
+                    try:
+                        new_pages = await fetch_page(page, proxy)
+                    except ConnectionError:
+                        queue.put_nowait(page)
+                        break
+                    except Exception:
+                        # the same failure through the next proxy mustn't use up the whole pool
+                        failures[page] += 1
+                        if failures[page] < page_attempts:
+                            queue.put_nowait(page)
+                            continue
+                        given_up.append(page)
+                        new_pages = []
+                    for new_page in new_pages:
+                        queue.put_nowait(new_page)
+                    left += len(new_pages) - 1
+                    if not left:
+                        done.set()
+                        return
+
+        tasks = [asyncio.create_task(worker()) for _ in range(min(workers, len(proxies)))]
+        # idle workers wait for pages in flight of others, so either all pages are done
+        # or all workers ran out of proxies
+        pages_done = asyncio.create_task(done.wait())
+        workers_done = asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await asyncio.wait([pages_done, workers_done], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (pages_done, *tasks):
+                task.cancel()
+            await asyncio.gather(pages_done, *tasks, return_exceptions=True)
+
+        missing_pages = given_up
+        while not queue.empty():
+            missing_pages.append(queue.get_nowait())
+        return sorted(missing_pages)
+
+    @staticmethod
+    async def refresh(
+            store: ProxyStore,
+            do_prints: bool = DO_PRINTS,
+            changes: dict[str, ProxyDiff] = None
+    ) -> bool:
+        """
+            Check for each registered source if update requires and scrap it, saving proxies to store.
+            Sources are scraped concurrently, except ones waiting for sources they depend on.
+            Proxies added, changed and removed by each updated source are saved to `changes` if passed.
+            Return True if proxies of any source were changed
+        """
+
+        sources = get_sources()
+        for source in sources.values():
+            store.set_source(source.domain, source.update_after_min)
+
+        tasks: dict[str, asyncio.Task] = {}
+
+        async def refresh_domain(source: ProxySource, website_data: dict) -> bool:
+            # independent sources are scraped concurrently, dependent ones wait for prerequisites
+            domain = source.domain
+            prerequisites = [tasks[d] for d in source.depends_on if d in tasks]
+            if prerequisites:
+                await asyncio.wait(prerequisites)
+
+            if (time.time() - website_data['last_update']) // 60 <= website_data['update_after_min']:
+                return False
+
+            started = time.perf_counter()
+            try:
+                # information saved by previous scrape, e.g. validators for conditional requests
+                extra = {k: v for k, v in website_data.items() if k not in ('update_after_min', 'last_update')}
+                proxies = await asyncio.wait_for(
+                    source.scrap(store, extra, do_prints=do_prints),
+                    timeout=source.timeout
                 )
+                METRICS.observe('scrape_seconds', time.perf_counter() - started, source=domain)
+                if proxies is None:
+                    store.touch_source(domain, int(time.time()), extra)
+                    logger.info(f'Not modified since previous scrape: {domain}') if do_prints else ...
+                    return False
+
+                diff = store.replace_proxies(domain, proxies, int(time.time()), extra)
+                if changes is not None:
+                    changes[domain] = diff
+                METRICS.set_gauge('scrape_rows', len(proxies), source=domain)
+                logger.info(f'Scrapped {len(proxies)} proxies from {domain} | added: {len(diff.added)}, '
+                            f'changed: {len(diff.changed)}, removed: {len(diff.removed)}') if do_prints else ...
+                return bool(diff)
+            except NotImplementedError:
+                return False
+            except asyncio.TimeoutError:
+                METRICS.inc('scrape_errors_total', source=domain, error='TimeoutError')
+                logger.error(f'Timeout {source.timeout}s while scrapping proxies from {domain}') \
+                    if do_prints else ...
+            except Exception as ex:
+                METRICS.inc('scrape_errors_total', source=domain, error=type(ex).__name__)
+                logger.exception(f'Error while scrapping proxies from {domain}') if do_prints else ...
+            return False
+
+        for domain, website_data in store.get_sources().items():
+            # sources saved in database, but not registered anymore, are kept as is
+            if domain in sources:
+                tasks[domain] = asyncio.create_task(refresh_domain(sources[domain], website_data))
+        return any(await asyncio.gather(*tasks.values()))
+
+    @staticmethod
+    async def scrap_or_read(do_prints: bool = DO_PRINTS, store: ProxyStore = None) -> dict[dict]:
+        """
+            Refresh outdated domains and return all data from store in format of json file used before.
+            If store is not passed, database from `open_store()` is used
+        """
+
+        if store is not None:
+            await Scraper.refresh(store, do_prints=do_prints)
+            return store.to_dict()
+
+        with open_store() as store:
+            await Scraper.refresh(store, do_prints=do_prints)
+            return store.to_dict()
+
+
+class RateLimiter:
+    """
+        Spaces requests at least 1 / `rate` seconds apart
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next_at = 0.
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        delay = self._next_at - now
+        self._next_at = max(now, self._next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ProxySource:
+    """
+        Website listing proxies. Subclass one of pagination strategies below and register instance with
+        `register_source()`, or expose class or instance from another package in entry point group
+        SOURCES_ENTRY_POINTS. Settings are class attributes, they can be overridden per instance:
+        `register_source(GeonodeSource(concurrency=4, rate_limit=2))`
+    """
+
+    domain: str = ''
+    # entry point, can be pointed to mirror or local stand-in
+    url: str = ''
+    # minutes after update before source is scraped again, some sites don't provide this information
+    update_after_min: int = 60
+    # max seconds to scrap source, so one hang can't stall the rest
+    timeout: float = 60
+    # requests in flight and requests per second, None for no rate limit
+    concurrency: int = PAGES_CONCURRENCY
+    rate_limit: float | None = None
+    # sources scraped through proxies collected from other sources start when these are done
+    depends_on: tuple[str, ...] = ()
+    headers: dict[str, str] | None = None
+    response_type: str = 'text'
+    # html pages are parsed in Parser thread pool
+    parse_in_thread: bool = True
+
+    def __init__(self, **settings):
+        for name, value in settings.items():
+            if not hasattr(self, name):
+                raise TypeError(f'Unknown setting {name!r} of {type(self).__name__}')
+            setattr(self, name, value)
+        self._limiter = RateLimiter(self.rate_limit) if self.rate_limit else None
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.domain})'
+
+    async def request(self, retries: int = 0, **kwargs) -> str | dict | None:
+        """
+            Send request with headers and rate limit of source. Return None if page is not modified
+            for conditional request, raise ConnectionError on other unexpected status
+        """
+
+        kwargs.setdefault('url', self.url)
+        kwargs.setdefault('response_type', self.response_type)
+        kwargs.setdefault('headers', self.headers)
+        response = await Scraper.send_request_with_retries(retries=retries, limiter=self._limiter, **kwargs)
+        if isinstance(response, ClientResponse):
+            if response.status == 304:
+                return None
+            raise ConnectionError(f'Status {response.status} | {self.domain}')
+        return response
+
+    async def request_if_modified(self, website_data: dict, **kwargs) -> str | dict | None:
+        """
+            Request page unless it is not modified since previous scrape, then return None.
+            ETag and Last-Modified of previous response are sent back, for servers not supporting them
+            hash of content is compared. Validators are saved to `website_data` under request url
+        """
+
+        url = kwargs.setdefault('url', self.url)
+        validators = website_data.setdefault('validators', {})
+        previous = validators.get(url, {})
+        headers = dict(kwargs.get('headers') or self.headers or {})
+        if 'etag' in previous:
+            headers['If-None-Match'] = previous['etag']
+        if 'last_modified' in previous:
+            headers['If-Modified-Since'] = previous['last_modified']
+        response_headers = {}
+        response = await self.request(**kwargs | {'headers': headers, 'response_headers': response_headers})
+        if response is None:
+            return None
 
-                params['limit'] = 500
-                for page in range(1, math.ceil(response['total'] / params['limit']) + 1):
-                    params['page'] = page
-                    response: dict = await Scraper.send_request(
-                        url='https://proxylist.geonode.com/api/proxy-list',
-                        response_type='json',
-                        params=params,
-                        timeout=20
+        current = {
+            'hash': hashlib.sha1(
+                (response if isinstance(response, str) else json.dumps(response, sort_keys=True)).encode()
+            ).hexdigest()
+        }
+        for header, key in (('etag', 'etag'), ('last-modified', 'last_modified')):
+            if header in response_headers:
+                current[key] = response_headers[header]
+        validators[url] = current
+        if current['hash'] == previous.get('hash'):
+            return None
+        return response
+
+    async def parse_response(self, response: str | dict, do_prints: bool = DO_PRINTS) -> list[dict]:
+        if self.parse_in_thread:
+            return await Parser.run(self.parse, response, do_prints)
+        return self.parse(response, do_prints)
+
+    def parse(self, response: str | dict, do_prints: bool = DO_PRINTS) -> list[dict]:
+        """
+            Proxies from page as dicts with "ip", "port", "protocols", "country", "anonymity", "last_checked"
+        """
+
+        raise NotImplementedError
+
+    async def scrap(self, store: ProxyStore, website_data: dict, do_prints: bool = DO_PRINTS) -> list[dict] | None:
+        """
+            All proxies of source or None if source is not modified since previous scrape.
+            `website_data` has information saved by previous scrape, additional information is saved to it
+        """
+
+        raise NotImplementedError
+
+
+class SinglePageSource(ProxySource):
+    """
+        Source listing all proxies on one page. Page is requested conditionally and is not parsed again
+        if it is not modified
+    """
+
+    async def scrap(self, store: ProxyStore, website_data: dict, do_prints: bool = DO_PRINTS) -> list[dict] | None:
+        response = await self.request_if_modified(website_data)
+        if response is None:
+            return None
+        return await self.parse_response(response, do_prints)
+
+
+class PaginatedSource(ProxySource):
+    """
+        Source with numbered pages, `concurrency` of them are fetched at once and failed ones are retried.
+        Proxies of other pages are kept if some pages failed, they are saved as "missing_pages" of source
+    """
+
+    retries: int = PAGE_RETRIES
+    page_timeout: float = 20
+
+    async def get_pages(self) -> Iterable[int]:
+        raise NotImplementedError
+
+    def page_params(self, page: int) -> dict:
+        raise NotImplementedError
+
+    async def scrap(self, store: ProxyStore, website_data: dict, do_prints: bool = DO_PRINTS) -> list[dict]:
+        proxies = []
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch_page(page: int) -> tuple[int, list[dict] | Exception]:
+            async with semaphore:
+                try:
+                    response = await self.request(
+                        retries=self.retries,
+                        params=self.page_params(page),
+                        timeout=self.page_timeout
                     )
+                    return page, await self.parse_response(response, do_prints)
+                except Exception as ex:
+                    return page, ex
 
-                    for proxy in response['data']:
-                        proxy_data = {
-                            'ip': proxy['ip'],
-                            'port': proxy['port'],
-                            'protocols': proxy['protocols'],
-                            'country': proxy['country'],
-                            'anonymity': proxy['anonymityLevel'],
-                            'last_checked': proxy['lastChecked']
-                        }
-                        proxies.append(proxy_data)
-                    print(f'Scrapped {len(proxies)} proxies | page={params["page"]} | {domain}') if do_prints else ...
-            case 'openproxy.space':
-                # https://openproxy.space/list/http
-                # host is not working now ...
-                raise NotImplementedError
-            case 'freeproxylists.net':
-                # 403 forbidden
-                raise NotImplementedError
-                # headers = {
-                #     'authority': 'www.freeproxylists.net',
-                #     'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9',
-                #     'accept-language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-                #     'cache-control': 'max-age=0',
-                #     # 'cookie': 'hl=ru; userno=20230103-000706; from=google; refdomain=www.google.com; visited=2023%2F01%2F03%2002%3A38%3A58; pv=6',
-                #     'origin': 'https://www.freeproxylists.net',
-                #     'referer': 'https://www.freeproxylists.net/ru/',
-                #     'sec-ch-ua': '"Not?A_Brand";v="8", "Chromium";v="108", "Google Chrome";v="108"',
-                #     'sec-ch-ua-mobile': '?0',
-                #     'sec-ch-ua-platform': '"Linux"',
-                #     'sec-fetch-dest': 'document',
-                #     'sec-fetch-mode': 'navigate',
-                #     'sec-fetch-site': 'same-origin',
-                #     'sec-fetch-user': '?1',
-                #     'upgrade-insecure-requests': '1',
-                #     'user-agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36',
-                # }
-                #
-                # last_page = None
-                # params = {'page': 1}
-                # while True:
-                #     response = await self._send_request(
-                #         url='https://www.freeproxylists.net/ru/',
-                #         response_type='text',
-                #         headers=headers,
-                #         params=params,
-                #         timeout=10
-                #     )
-                #     soup = BeautifulSoup(response, 'lxml')
-                #     if not last_page:
-                #         last_page = int(soup.find('div', class_='page').find_all('a')[-2].text)
-                #
-                #     count_before = len(proxies)
-                #     for tr in soup.find('table', class_='DataGrid').find_all('tr')[1:]:
-                #         try:
-                #             ip_hex = str(tr.find_all('td')[0].string).replace('IPDecode', '')[2:-2]
-                #             ip = BeautifulSoup(bytearray.fromhex(ip_hex.replace('%', '')).decode(), 'lxml').text
-                #             port = tr.find_all('td')[1].text
-                #             proxies.append(f'{ip}:{port}')
-                #         except IndexError:
-                #             continue
-                #     count_after = len(proxies)
-                #
-                #     print(f'{domain=} | page={params["page"]} | proxies from page: {count_after - count_before} |'
-                #           f'total: {len(proxies)}') if do_prints else None
-                #
-                #     if params['page'] == last_page:
-                #         break
-                #     params['page'] += 1
-            case 'hidemy.name':
-                headers = {
-                    "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,"
-                              "image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                    "accept-encoding": "gzip, deflate, utf-8",
-                    "accept-language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
-                    'sec-ch-ua': '"Google Chrome";v="107", "Chromium";v="107", "Not=A?Brand";v="24"',
-                    'sec-ch-ua-mobile': '?0',
-                    'sec-ch-ua-platform': '"Linux"',
-                    'sec-fetch-dest': 'document',
-                    'sec-fetch-mode': 'navigate',
-                    'sec-fetch-site': 'none',
-                    'sec-fetch-user': '?1',
-                    'upgrade-insecure-requests': '1',
-                    "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
-                                  "Chrome/107.0.0.0 Safari/537.36"
-                }
-
-                proxies_to_scrap = DataHandler.get_proxies_list(data, 'socks4')
-                # making request to get pagination
-                response = await Scraper.send_request(
-                    url=f'https://hidemy.name/en/proxy-list/',
-                    response_type='text',
-                    headers=headers,
-                    timeout=3
-                )
-                if isinstance(response, ClientResponse) and response.status == 403:
-                    while isinstance(response, ClientResponse):
-                        tasks = []
-                        for proxy in proxies_to_scrap:
-                            task = asyncio.create_task(
-                                Scraper.send_request(
-                                    url=f'https://hidemy.name/en/proxy-list/',
-                                    response_type='text',
-                                    connector=ProxyConnector.from_url(f'socks4://{proxy}'),
-                                    headers=headers,
-                                    timeout=5
-                                )
-                            )
-                            tasks.append(task)
-                        for result in await asyncio.gather(*tasks):
-                            if isinstance(result, str):
-                                response = result
-                                break
-
-                last_pagination = int(BeautifulSoup(response, 'lxml').
-                                      find('div', class_='pagination').find_all('li')[-2].text)
-
-                pages = [x for x in range(last_pagination + 1)]
-
-                while pages:
-                    pages_to_tasks = pages * (len(proxies_to_scrap) // len(pages))
-                    pages_to_tasks += pages[:len(proxies_to_scrap) - len(pages_to_tasks)]
-                    tasks = []
-
-                    for proxy, page in zip(proxies_to_scrap, pages_to_tasks):
-                        tasks.append(
-                            asyncio.create_task(
-                                Scraper.send_request(
-                                    url=f'https://hidemy.name/en/proxy-list/',
-                                    response_type='text',
-                                    connector=ProxyConnector.from_url(f'socks4://{proxy}'),
-                                    headers=headers,
-                                    params={'start': page * 64},
-                                    timeout=15
-                                )
-                            )
-                        )
+        missing_pages = []
+        for task in asyncio.as_completed([fetch_page(page) for page in await self.get_pages()]):
+            page, rows = await task
+            if isinstance(rows, Exception):
+                missing_pages.append(page)
+                logger.warning(f'Failed page={page}: {rows!r} | {self.domain}') if do_prints else ...
+                continue
+            proxies += rows
+            logger.info(f'Scrapped {len(proxies)} proxies | page={page} | {self.domain}') if do_prints else ...
 
-                    for result, page in zip(await asyncio.gather(*tasks, return_exceptions=True), pages_to_tasks):
-                        if page not in pages:
-                            continue
-                        if isinstance(result, str):
-                            soup = BeautifulSoup(result, 'lxml')
-
-                            for tr in soup.table.tbody.find_all('tr'):
-                                tds = tr.find_all('td')
-                                proxy_data = {
-                                    'ip': tds[0].text,
-                                    'port': tds[1].text,
-                                    'protocols': [x.lower().strip() for x in tds[4].text.split(',')],
-                                    'country': ...,
-                                    'anonymity': ...,
-                                    'last_checked': ...,
-                                }
-
-                                match tds[2].find('span', class_='country').text.strip().lower():
-                                    case 'kazakstan':
-                                        country_code = 'KZ'
-                                    case unhandled:
-                                        try:
-                                            country_code = pycountry.countries.search_fuzzy(unhandled)[0] \
-                                                .alpha_2
-                                        except LookupError:
-                                            country_code = None
-                                proxy_data['country'] = country_code
-
-                                match tds[-2].text.lower():
-                                    case 'no':
-                                        proxy_data['anonymity'] = 'transparent'
-                                    case 'low' | 'average':
-                                        proxy_data['anonymity'] = 'anonymous'
-                                    case 'high':
-                                        proxy_data['anonymity'] = 'elite'
-                                    case _:
-                                        print(f'Unexpected anonymity type in row: {tds[-2].text} |'
-                                              f' {domain=}') if do_prints else ...
-
-                                match tds[-1].text.split():
-                                    case n_seconds, 'seconds':
-                                        proxy_data['last_checked'] = int(time.time()) - (int(n_seconds))
-                                    case n_minutes, 'minutes':
-                                        proxy_data['last_checked'] = int(time.time()) - (int(n_minutes) * 60)
-                                    case n_hours, 'h.', n_minutes, 'min.':
-                                        proxy_data['last_checked'] = \
-                                            int(time.time() - (int(n_hours) * 3600 + int(n_minutes) * 60))
-                                    case _:
-                                        print(f'Unexpected time metric in row: {tds[-1].text} |'
-                                              f' {domain=}') if do_prints else ...
-                                proxies.append(proxy_data)
-                            pages.remove(page)
-                            print(f'Scrapped {len(proxies)} proxies | pages left: {len(pages)} |'
-                                  f' {domain}') if do_prints else ...
+        # keep partial results, missing pages are saved with source information
+        website_data['missing_pages'] = sorted(missing_pages)
+        if missing_pages:
+            logger.warning(f'Missing pages: {sorted(missing_pages)} | {self.domain}') if do_prints else ...
         return proxies
 
-    @staticmethod
-    async def scrap_or_read(do_prints: bool = DO_PRINTS) -> dict[dict]:
+
+class ProxiedCrawlSource(ProxySource):
+    """
+        Source blocking direct requests, crawled through proxies of `proxy_protocol` collected from other sources
+        by `concurrency` workers (see `Scraper._crawl_pages()`). Pages are saved as soon as they are parsed,
+        so interrupted crawl continues from missing ones on the next refresh
+    """
+
+    proxy_protocol: str = 'socks4'
+    concurrency: int = CRAWL_WORKERS
+    direct_timeout: float = 3
+    proxy_timeout: float = 15
+
+    def page_params(self, page: int) -> dict | None:
+        raise NotImplementedError
+
+    def last_page(self, response: str) -> int:
         """
-            Check for each domain if update requires, run scrapper or keep existing proxies from json.
-            If file does not exist, create empty dict based on WEBSITES_WITH_PROXIES.
+            Number of last page from the first one, pages are numbered from 0
         """
 
-        if FILEPATH.exists():
-            with open(FILEPATH, 'r') as f:
-                data = json.load(f)
+        raise NotImplementedError
+
+    async def scrap(self, store: ProxyStore, website_data: dict, do_prints: bool = DO_PRINTS) -> list[dict]:
+        proxies = []
+        # pages parsed before interruption are not requested again
+        crawled = store.load_crawl(self.domain, max_age=self.update_after_min * 60)
+        for page, rows in crawled.items():
+            # first page is requested on each crawl for pagination
+            if page:
+                proxies += rows
+
+        async def fetch_page(page: int, proxy: str | None) -> list[int]:
+            try:
+                response = await self.request(
+                    proxy=f'{self.proxy_protocol}://{proxy}' if proxy else None,
+                    params=self.page_params(page),
+                    timeout=self.proxy_timeout if proxy else self.direct_timeout
+                )
+                rows = await self.parse_response(response, do_prints)
+            except (
+                    OSError, asyncio.TimeoutError, ClientError,
+                    ProxyError, ProxyTimeoutError, ProxyConnectionError, ProxyTableNotFound
+            ) as ex:
+                # network error, unexpected status and captcha instead of table mean proxy is not usable
+                raise ConnectionError(f'Page {page} is not available through {proxy} ({ex!r})') from ex
+            if not rows:
+                # empty table is served instead of proxies too, page is retried a few times
+                raise ValueError(f'no proxies on page {page}')
+            new_pages = []
+            if page == 0:
+                last_page = await Parser.run(self.last_page, response)
+                new_pages = [p for p in range(1, last_page + 1) if p not in crawled]
+            proxies.extend(rows)
+            store.save_crawl_page(self.domain, page, rows)
+            logger.info(f'Scrapped {len(proxies)} proxies | page={page} | {self.domain}') if do_prints else ...
+            return new_pages
+
+        try:
+            pages = await fetch_page(0, None)
+        except Exception as ex:
+            pages = [0]
+            logger.info(f'First page is not available directly ({ex!r}), using proxies | {self.domain}') \
+                if do_prints else ...
+
+        missing_pages = await Scraper._crawl_pages(
+            pages, store.get_proxies_list(self.proxy_protocol, unique=True), fetch_page, self.concurrency
+        )
+        if missing_pages:
+            # progress is saved, next refresh continues from missing pages
+            raise ConnectionError(f'{len(missing_pages)} pages are not scrapped: {missing_pages}')
+        return proxies
+
+
+class FreeProxyListSource(SinglePageSource):
+    domain = 'free-proxy-list.net'
+    url = 'https://free-proxy-list.net'
+    update_after_min = 30
+    timeout = 60
+
+    def parse(self, response: str, do_prints: bool = DO_PRINTS) -> list[dict]:
+        return Parser.free_proxy_list(response, do_prints)
+
+
+class GeonodeSource(PaginatedSource):
+    """
+        Whole list is fetched every `full_update_after_min` minutes, in between only proxies checked
+        since previous scrape are fetched, sorted by check time, and merged to saved ones.
+        If they take more than `delta_max_pages` pages or fetching them fails, whole list is fetched
+    """
+
+    domain = 'geonode.com'
+    url = 'https://proxylist.geonode.com/api/proxy-list'
+    update_after_min = 60
+    full_update_after_min = 60 * 12
+    timeout = 60 * 10
+    response_type = 'json'
+    parse_in_thread = False
+    page_size = 500
+    # proxies checked since previous scrape on more pages than this are fetched with whole list
+    delta_max_pages = 4
+
+    async def scrap(self, store: ProxyStore, website_data: dict, do_prints: bool = DO_PRINTS) -> list[dict] | None:
+        now = int(time.time())
+        checked_since = website_data.get('last_checked')
+        recent = None
+        if checked_since is not None and now - website_data.get('full_update', 0) <= self.full_update_after_min * 60:
+            try:
+                recent = await self._scrap_checked_since(checked_since, do_prints)
+            except Exception as ex:
+                logger.warning(f'Failed to fetch proxies checked since previous scrape ({ex!r}), '
+                               f'fetching whole list | {self.domain}') if do_prints else ...
+
+        if recent is None:
+            proxies = await super().scrap(store, website_data, do_prints)
+            if not website_data['missing_pages']:
+                website_data['full_update'] = now
+        elif not recent:
+            return None
         else:
-            data = {}
-
-        for domain, update_after_min in WEBSITES_WITH_PROXIES.items():
-            if not data.get(domain):
-                data[domain] = {
-                    'update_after_min': update_after_min,
-                    'last_update': int(time.time() - (update_after_min + 1) * 60),
-                    'proxies': []
-                }
-            # overwrite update_after_min in json
-            elif data.get(domain) and data[domain]['update_after_min'] != update_after_min:
-                data[domain]['update_after_min'] = update_after_min
-
-        anyone_updated = False
-        for domain, website_data in data.items():
-            if (time.time() - website_data['last_update']) // 60 > website_data['update_after_min']:
-                try:
-                    website_data['proxies'] = await Scraper._scrap_website(domain, data)
-                    website_data['last_update'] = int(time.time())
-                    anyone_updated = True
-                    print(f'Scrapped {len(website_data["proxies"])} proxies from {domain}') if do_prints else ...
-                except NotImplementedError:
-                    pass
-                except Exception:
-                    print(f'Error while scrapping proxies from {domain}\n'
-                          f'{traceback.format_exc()}') if do_prints else ...
+            merged = {(proxy['ip'], int(proxy['port'])): proxy for proxy in store.iter_proxies(self.domain)}
+            for proxy in recent:
+                merged[proxy['ip'], int(proxy['port'])] = proxy
+            proxies = list(merged.values())
+            logger.info(f'Fetched {len(recent)} proxies checked since previous scrape | {self.domain}') \
+                if do_prints else ...
+
+        website_data['last_checked'] = max((p['last_checked'] or 0 for p in proxies), default=checked_since)
+        return proxies
 
-        if anyone_updated:
-            with open(FILEPATH, 'w') as f:
-                json.dump(data, f, indent=4)
+    async def _scrap_checked_since(self, checked_since: int, do_prints: bool = DO_PRINTS) -> list[dict] | None:
+        """
+            Proxies checked after `checked_since` from pages sorted by the latest check, `concurrency` pages at once.
+            None if they don't fit in `delta_max_pages` pages, then whole list is fetched instead
+        """
 
-        return data
+        async def fetch_page(page: int) -> list[dict]:
+            response = await self.request(
+                retries=self.retries,
+                params=self.page_params(page) | {'sort_by': 'lastChecked', 'sort_type': 'desc'},
+                timeout=self.page_timeout
+            )
+            return await self.parse_response(response, do_prints)
+
+        proxies = []
+        page = 1
+        # usually few proxies were checked, so first page is fetched alone
+        batch_size = 1
+        while page <= self.delta_max_pages:
+            batch = range(page, min(page + batch_size, self.delta_max_pages + 1))
+            batch_size = self.concurrency
+            for rows in await asyncio.gather(*(fetch_page(p) for p in batch), return_exceptions=True):
+                if isinstance(rows, Exception):
+                    raise rows
+                proxies += [proxy for proxy in rows if (proxy['last_checked'] or 0) > checked_since]
+                if len(rows) < self.page_size or any((proxy['last_checked'] or 0) <= checked_since for proxy in rows):
+                    return proxies
+            page = batch.stop
+        logger.info(f'More than {self.delta_max_pages} pages were checked since previous scrape, '
+                    f'fetching whole list | {self.domain}') if do_prints else ...
+        return None
+
+    async def get_pages(self) -> Iterable[int]:
+        response = await self.request(params=self.page_params(1) | {'limit': 1})
+        return range(1, math.ceil(response['total'] / self.page_size) + 1)
+
+    def page_params(self, page: int) -> dict:
+        return {
+            "limit": self.page_size,
+            "page": page,
+            "sort_by": "",
+            "sort_type": "",
+            "protocols": '',
+        }
+
+    def parse(self, response: dict, do_prints: bool = DO_PRINTS) -> list[dict]:
+        return [
+            {
+                'ip': proxy['ip'],
+                'port': proxy['port'],
+                'protocols': proxy['protocols'],
+                'country': country_code(proxy['country']),
+                'anonymity': proxy['anonymityLevel'],
+                'last_checked': proxy['lastChecked']
+            } for proxy in response['data']
+        ]
+
+
+class HidemyNameSource(ProxiedCrawlSource):
+    domain = 'hidemy.name'
+    url = 'https://hidemy.name/en/proxy-list/'
+    update_after_min = 60 * 24 * 3
+    timeout = 60 * 30
+    depends_on = ('free-proxy-list.net', 'geonode.com')
+    headers = {
+        "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,"
+                  "image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
+        "accept-encoding": "gzip, deflate, utf-8",
+        "accept-language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
+        'sec-ch-ua': '"Google Chrome";v="107", "Chromium";v="107", "Not=A?Brand";v="24"',
+        'sec-ch-ua-mobile': '?0',
+        'sec-ch-ua-platform': '"Linux"',
+        'sec-fetch-dest': 'document',
+        'sec-fetch-mode': 'navigate',
+        'sec-fetch-site': 'none',
+        'sec-fetch-user': '?1',
+        'upgrade-insecure-requests': '1',
+        "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                      "Chrome/107.0.0.0 Safari/537.36"
+    }
+
+    def page_params(self, page: int) -> dict | None:
+        return {'start': page * 64} if page else None
+
+    def last_page(self, response: str) -> int:
+        return Parser.hidemy_name_last_page(response)
+
+    def parse(self, response: str, do_prints: bool = DO_PRINTS) -> list[dict]:
+        return Parser.hidemy_name(response, do_prints)
+
+
+# Not working now: openproxy.space (host is down since 16.02.2023), freeproxylists.net (403 forbidden)
+SOURCES: dict[str, ProxySource] = {}
+_entry_points_loaded = False
+
+
+def register_source(source: ProxySource) -> ProxySource:
+    """
+        Add source to scrap or replace registered one with the same domain
+    """
+
+    SOURCES[source.domain] = source
+    return source
+
+
+def get_sources() -> dict[str, ProxySource]:
+    """
+        Registered sources by domain, including ones exposed by installed packages in SOURCES_ENTRY_POINTS
+    """
+
+    global _entry_points_loaded
+    if not _entry_points_loaded:
+        _entry_points_loaded = True
+        for entry_point in importlib.metadata.entry_points(group=SOURCES_ENTRY_POINTS):
+            try:
+                source = entry_point.load()
+                register_source(source() if isinstance(source, type) else source)
+            except Exception:
+                logger.exception(f'Error while loading source {entry_point.name!r}')
+    return SOURCES
+
+
+for _source in (FreeProxyListSource(), GeonodeSource(), HidemyNameSource()):
+    register_source(_source)
+
+
+def log_to_console(do_prints: bool = DO_PRINTS) -> None:
+    """
+        Print logs of package to stderr, if `do_prints` and logging is not configured by application
+    """
+
+    if do_prints and not logging.getLogger().handlers and \
+            not any(not isinstance(h, logging.NullHandler) for h in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+def open_store() -> ProxyStore:
+    """
+        Database in DB_FILEPATH with data imported from json file used before
+    """
+
+    store = ProxyStore(DB_FILEPATH)
+    store.migrate_json(FILEPATH)
+    return store
+
+
+def _probe_concurrency(checkers: int) -> int:
+    """
+        PREFILTER_CONCURRENCY, lowered so probes and `checkers` fit in half of descriptors limit of process.
+        Probes run out of descriptors faster than checks, and checks failing with EMFILE look like dead proxies
+    """
+
+    try:
+        import resource
+    except ImportError:
+        # no descriptors limit on Windows
+        return PREFILTER_CONCURRENCY
+
+    soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit == resource.RLIM_INFINITY:
+        return PREFILTER_CONCURRENCY
+    return max(1, min(PREFILTER_CONCURRENCY, soft_limit // 2 - checkers))
+
+
+def _test_shard(proxies: list[str], args: tuple, queue: multiprocessing.Queue) -> None:
+    """
+        Worker process of sharded check. Put results to queue as tuples with metrics observed since previous one,
+        so parent process reports them too, and None when done
+    """
+
+    observations = []
+    gauges = {}
+
+    def collect(kind: str, name: str, value: float, labels: dict[str, str]) -> None:
+        if kind == 'gauge':
+            # parent sums gauges of all workers, so changes are sent
+            key = (name, tuple(sorted(labels.items())))
+            value, gauges[key] = value - gauges.get(key, 0), value
+        observations.append((kind, name, value, labels))
+
+    METRICS.add_hook(collect)
+
+    async def run() -> None:
+        async for result in Scraper._iter_test_bounded(proxies, *args):
+            queue.put((tuple(result), observations[:]))
+            observations.clear()
+
+    try:
+        asyncio.run(SessionManager.closing(run()))
+    finally:
+        queue.put((None, observations))
+        queue.put(None)
 
 
 def get_proxies(
         protocol: str = None,
         source: str = None,
         do_prints: bool = DO_PRINTS,
+        country: str = None,
+        anonymity: str = None,
+        unique: bool = True,
 ) -> list[str]:
     """
-        High level function for import in other synchronous project
+        High level function for import in other synchronous project.
+        With `unique` proxy listed by several sources is returned once
     """
 
-    return DataHandler.get_proxies_list(
+    log_to_console(do_prints)
+    with open_store() as store:
         asyncio.run(
-            Scraper.scrap_or_read(do_prints=do_prints)
-        ),
-        protocol=protocol,
-        source=source
-    )
+            SessionManager.closing(Scraper.refresh(store, do_prints=do_prints))
+        )
+        return store.get_proxies_list(
+            protocol=protocol,
+            source=source,
+            country=country,
+            anonymity=anonymity,
+            unique=unique
+        )
 
 
 def test_proxies(
         proxies: list[str],
         proxy_protocol: str,
         website_protocol: str,
-        url: str = WEBSITES_TO_TEST_IP[0],
+        url: str | Judge = WEBSITES_TO_TEST_IP[0],
         timeout: int = 3,
-        do_prints: bool = DO_PRINTS
+        do_prints: bool = DO_PRINTS,
+        limit: int = CHECK_CONCURRENCY,
+        limit_per_host: int | None = CHECK_LIMIT_PER_HOST,
+        save_scores: bool = True,
+        max_age: float = None,
+        processes: int = None,
+        prefilter: float | None = PREFILTER_TIMEOUT,
 ) -> list[str]:
     """
-        High level function for testing proxies in other synchronous project
+        High level function for testing proxies in other synchronous project.
+        With `save_scores` latency and reliability of each proxy are saved for `get_best_proxies()`.
+        Results of checks are saved too, with `max_age` in seconds only proxies not checked during this time
+        are requested again (failed ones are skipped longer with each failure in a row).
+        With `processes` > 1 checks are split between that many processes for very large lists.
+        Proxies not accepting connection in `prefilter` seconds fail without full check, None disables probe
     """
 
-    return asyncio.run(
-        Scraper.test_public_ip(
+    log_to_console(do_prints)
+    with open_store() as store:
+        scoreboard = Scoreboard.from_store(store) if save_scores else None
+        cache = CheckCache.from_store(store, proxy_protocol, get_judge(url).url(website_protocol))
+        working_proxies = asyncio.run(
+            SessionManager.closing(
+                Scraper.test_public_ip(
+                    proxies=proxies,
+                    proxy_protocol=proxy_protocol,
+                    website_protocol=website_protocol,
+                    url=url,
+                    timeout=timeout,
+                    do_prints=do_prints,
+                    limit=limit,
+                    limit_per_host=limit_per_host,
+                    scoreboard=scoreboard,
+                    cache=cache,
+                    max_age=max_age,
+                    processes=processes,
+                    prefilter=prefilter
+                )
+            )
+        )
+        if scoreboard is not None:
+            scoreboard.save(store)
+        cache.save(store)
+    return working_proxies
+
+
+def iter_working_proxies(
+        proxies: list[str],
+        proxy_protocol: str,
+        website_protocol: str,
+        url: str | Judge = WEBSITES_TO_TEST_IP[0],
+        timeout: int = 3,
+        limit: int = CHECK_CONCURRENCY,
+        limit_per_host: int | None = CHECK_LIMIT_PER_HOST,
+        save_scores: bool = True,
+        max_age: float = None,
+        processes: int = None,
+        prefilter: float | None = PREFILTER_TIMEOUT,
+) -> Iterator[CheckResult]:
+    """
+        High level generator of working proxies for synchronous project.
+        Checks run only while generator waits for the next proxy and stop when generator is closed.
+        Options are the same as of `test_proxies()`, scores and checks are saved when generator ends
+    """
+
+    loop = asyncio.new_event_loop()
+    with open_store() as store:
+        scoreboard = Scoreboard.from_store(store) if save_scores else None
+        cache = CheckCache.from_store(store, proxy_protocol, get_judge(url).url(website_protocol))
+        agen = Scraper.iter_working_proxies(
             proxies=proxies,
             proxy_protocol=proxy_protocol,
             website_protocol=website_protocol,
             url=url,
             timeout=timeout,
-            do_prints=do_prints
+            limit=limit,
+            limit_per_host=limit_per_host,
+            scoreboard=scoreboard,
+            cache=cache,
+            max_age=max_age,
+            processes=processes,
+            prefilter=prefilter
         )
-    )
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(agen.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(agen.aclose())
+            loop.run_until_complete(SessionManager.close())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+            if scoreboard is not None:
+                scoreboard.save(store)
+            cache.save(store)
+
+
+def get_best_proxies(protocol: str = None, n: int = 10) -> list[str]:
+    """
+        High level function returning `n` fastest and most reliable proxies by results of `test_proxies()`
+    """
+
+    with open_store() as store:
+        return [score.proxy for score in Scoreboard.from_store(store).best(protocol, n)]
+
+
+def pick_proxy(protocol: str = None) -> str | None:
+    """
+        High level function returning one of the best proxies, faster ones are picked more often
+    """
+
+    with open_store() as store:
+        return Scoreboard.from_store(store).pick(protocol)
 
 
 async def async_main():
     """ TEST """
-    data = await Scraper.scrap_or_read()
+    data = await SessionManager.closing(Scraper.scrap_or_read())
     proxies = DataHandler.get_proxies_list(data, protocol='https')
     print(len(proxies))
 
@@ -0,0 +1,148 @@
+import time
+import heapq
+import random
+
+# Results of checks lose half of their weight every SCORE_HALF_LIFE seconds
+SCORE_HALF_LIFE = 60 * 60
+# `pick()` chooses randomly among this count of best proxies, weighted by score
+PICK_CANDIDATES = 50
+
+
+class ProxyScore:
+    """
+        Latency and reliability of proxy for one protocol. Successes, failures and mean latency
+        decay exponentially with time, so recent checks matter more
+    """
+
+    __slots__ = ('proxy', 'protocol', 'latency', 'successes', 'failures', 'last_success', 'updated_at')
+
+    def __init__(
+            self,
+            proxy: str,
+            protocol: str,
+            latency: float | None = None,
+            successes: float = 0.,
+            failures: float = 0.,
+            last_success: float | None = None,
+            updated_at: float | None = None,
+    ):
+        self.proxy = proxy
+        self.protocol = protocol
+        self.latency = latency
+        self.successes = successes
+        self.failures = failures
+        self.last_success = last_success
+        self.updated_at = updated_at
+
+    def __repr__(self) -> str:
+        return f'ProxyScore({self.protocol}://{self.proxy}, latency={self.latency}, ' \
+               f'successes={self.successes:.2f}, failures={self.failures:.2f})'
+
+    def _decay(self, now: float, half_life: float) -> float:
+        if self.updated_at is None:
+            return 1.
+        return 0.5 ** (max(now - self.updated_at, 0) / half_life)
+
+    def record(self, latency: float | None, now: float = None, half_life: float = SCORE_HALF_LIFE) -> None:
+        """
+            Add result of check, `latency` is None if check failed
+        """
+
+        now = time.time() if now is None else now
+        decay = self._decay(now, half_life)
+        self.successes *= decay
+        self.failures *= decay
+
+        if latency is None:
+            self.failures += 1
+        else:
+            # mean latency weighted by decayed count of previous successes
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency = (self.latency * self.successes + latency) / (self.successes + 1)
+            self.successes += 1
+            self.last_success = now
+        self.updated_at = now
+
+    @property
+    def reliability(self) -> float:
+        """ Share of successful checks with prior of one success and one failure """
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    @property
+    def cost(self) -> float:
+        """ Expected latency per successful request, lower is better """
+        if self.latency is None:
+            return float('inf')
+        return self.latency / self.reliability
+
+
+class Scoreboard:
+    """
+        Scores of checked proxies with selection of the fastest and most reliable ones
+    """
+
+    def __init__(self, half_life: float = SCORE_HALF_LIFE):
+        self.half_life = half_life
+        self._scores: dict[tuple[str, str], ProxyScore] = {}
+
+    @classmethod
+    def from_store(cls, store, half_life: float = SCORE_HALF_LIFE) -> 'Scoreboard':
+        """
+            Scoreboard with scores saved in ProxyStore
+        """
+
+        scoreboard = cls(half_life)
+        for row in store.load_scores():
+            score = ProxyScore(*row)
+            scoreboard._scores[score.proxy, score.protocol] = score
+        return scoreboard
+
+    def save(self, store) -> None:
+        """
+            Save all scores to ProxyStore
+        """
+
+        store.save_scores(
+            (s.proxy, s.protocol, s.latency, s.successes, s.failures, s.last_success, s.updated_at)
+            for s in self._scores.values()
+        )
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def get(self, proxy: str, protocol: str) -> ProxyScore | None:
+        return self._scores.get((proxy, protocol))
+
+    def record(self, proxy: str, protocol: str, latency: float | None, now: float = None) -> ProxyScore:
+        """
+            Add result of check, `latency` is None if check failed
+        """
+
+        score = self._scores.get((proxy, protocol))
+        if score is None:
+            score = self._scores[proxy, protocol] = ProxyScore(proxy, protocol)
+        score.record(latency, now, self.half_life)
+        return score
+
+    def best(self, protocol: str = None, n: int = 10) -> list[ProxyScore]:
+        """
+            `n` proxies with the lowest expected latency, only ones passed check at least once
+        """
+
+        return heapq.nsmallest(
+            n,
+            (s for s in self._scores.values() if s.latency is not None and (not protocol or s.protocol == protocol)),
+            key=lambda s: s.cost
+        )
+
+    def pick(self, protocol: str = None) -> str | None:
+        """
+            Random proxy among PICK_CANDIDATES best ones, faster and more reliable are picked more often
+        """
+
+        candidates = self.best(protocol, PICK_CANDIDATES)
+        if not candidates:
+            return None
+        return random.choices(candidates, weights=[1 / max(s.cost, 1e-6) for s in candidates])[0].proxy
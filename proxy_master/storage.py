@@ -0,0 +1,384 @@
+import json
+import time
+import sqlite3
+from pathlib import Path
+from typing import (
+    Iterable,
+    Iterator,
+    NamedTuple,
+)
+
+DB_FILEPATH = Path(Path.home(), 'proxy_master').with_suffix('.sqlite3')
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sources (
+        source TEXT PRIMARY KEY,
+        update_after_min INTEGER NOT NULL,
+        last_update INTEGER NOT NULL,
+        extra TEXT NOT NULL DEFAULT '{}'
+    );
+    CREATE TABLE IF NOT EXISTS proxies (
+        id INTEGER PRIMARY KEY,
+        source TEXT NOT NULL,
+        ip TEXT NOT NULL,
+        port INTEGER NOT NULL,
+        country TEXT,
+        anonymity TEXT,
+        last_checked INTEGER,
+        refresh_id INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (source, ip, port)
+    );
+    CREATE TABLE IF NOT EXISTS protocols (
+        protocol TEXT NOT NULL,
+        proxy_id INTEGER NOT NULL REFERENCES proxies (id) ON DELETE CASCADE,
+        PRIMARY KEY (protocol, proxy_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS protocols_proxy_id ON protocols (proxy_id);
+    CREATE INDEX IF NOT EXISTS proxies_country ON proxies (country);
+    CREATE INDEX IF NOT EXISTS proxies_anonymity ON proxies (anonymity);
+    CREATE INDEX IF NOT EXISTS proxies_last_checked ON proxies (last_checked);
+    CREATE TABLE IF NOT EXISTS scores (
+        proxy TEXT NOT NULL,
+        protocol TEXT NOT NULL,
+        latency REAL,
+        successes REAL NOT NULL,
+        failures REAL NOT NULL,
+        last_success REAL,
+        updated_at REAL,
+        PRIMARY KEY (proxy, protocol)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS checks (
+        proxy TEXT NOT NULL,
+        protocol TEXT NOT NULL,
+        target TEXT NOT NULL,
+        latency REAL,
+        checked_at REAL NOT NULL,
+        fail_streak INTEGER NOT NULL,
+        anonymity TEXT,
+        PRIMARY KEY (protocol, target, proxy)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS crawl_pages (
+        source TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        proxies TEXT NOT NULL,
+        crawled_at REAL NOT NULL,
+        PRIMARY KEY (source, page)
+    ) WITHOUT ROWID;
+"""
+
+
+class ProxyDiff(NamedTuple):
+    """ Proxies "IP:PORT" of source changed by update """
+    added: list[str]
+    changed: list[str]
+    removed: list[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+class ProxyStore:
+    """
+        SQLite database of scraped proxies in WAL mode, so several processes can read and update it.
+        Proxies of each source are replaced atomically in one transaction
+    """
+
+    def __init__(self, path: Path = DB_FILEPATH):
+        self.path = path
+        self.connection = sqlite3.connect(path, isolation_level=None, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        self.connection.executescript(SCHEMA)
+        self._add_column('checks', 'anonymity', 'TEXT')
+
+    def _add_column(self, table: str, column: str, column_type: str) -> None:
+        # tables created by older version miss columns added since then
+        if column in {row['name'] for row in self.connection.execute(f'PRAGMA table_info({table})')}:
+            return
+        try:
+            self.connection.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+        except sqlite3.OperationalError:
+            # added by another process meanwhile
+            pass
+
+    def __enter__(self) -> 'ProxyStore':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def migrate_json(self, path: Path) -> bool:
+        """
+            Import data from json file used before, if database has no sources yet.
+            Imported file is renamed with suffix ".json.bak"
+        """
+
+        if not path.exists() or self.connection.execute('SELECT 1 FROM sources LIMIT 1').fetchone():
+            return False
+
+        with open(path, 'r') as f:
+            data = json.load(f)
+
+        for source, website_data in data.items():
+            website_data = dict(website_data)
+            proxies = website_data.pop('proxies')
+            update_after_min = website_data.pop('update_after_min')
+            last_update = website_data.pop('last_update')
+            self.set_source(source, update_after_min, last_update)
+            self.replace_proxies(source, proxies, last_update, website_data)
+
+        path.rename(path.with_suffix('.json.bak'))
+        return True
+
+    def set_source(self, source: str, update_after_min: int, last_update: int = None) -> None:
+        """
+            Add source or overwrite its update interval. New source is outdated by default
+        """
+
+        if last_update is None:
+            last_update = int(time.time() - (update_after_min + 1) * 60)
+
+        self.connection.execute(
+            'INSERT INTO sources (source, update_after_min, last_update) VALUES (?, ?, ?) '
+            'ON CONFLICT (source) DO UPDATE SET update_after_min = excluded.update_after_min',
+            (source, update_after_min, last_update)
+        )
+
+    def get_sources(self) -> dict[str, dict]:
+        """
+            Sources with "update_after_min", "last_update" and extra information saved by scrapers
+        """
+
+        return {
+            row['source']: {
+                'update_after_min': row['update_after_min'],
+                'last_update': row['last_update'],
+                **json.loads(row['extra'])
+            } for row in self.connection.execute('SELECT * FROM sources')
+        }
+
+    def replace_proxies(self, source: str, proxies: list[dict], last_update: int, extra: dict = None) -> ProxyDiff:
+        """
+            Atomically upsert proxies of source, delete ones absent in `proxies` and set source last update.
+            Pages saved by interrupted crawl of source are deleted too.
+            Return proxies added, changed (protocols, country or anonymity) and removed
+        """
+
+        cursor = self.connection.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            previous = {
+                (row['ip'], row['port']): (
+                    row['country'],
+                    row['anonymity'],
+                    frozenset(row['protocols'].split(',') if row['protocols'] else ())
+                ) for row in cursor.execute(
+                    'SELECT p.ip, p.port, p.country, p.anonymity, GROUP_CONCAT(pr.protocol) AS protocols '
+                    'FROM proxies p LEFT JOIN protocols pr ON pr.proxy_id = p.id WHERE p.source = ? GROUP BY p.id',
+                    (source,)
+                )
+            }
+            refresh_id = cursor.execute(
+                'SELECT COALESCE(MAX(refresh_id), 0) + 1 FROM proxies WHERE source = ?', (source,)
+            ).fetchone()[0]
+
+            current = {}
+            for proxy in proxies:
+                key = (proxy['ip'], int(proxy['port']))
+                proxy_id = cursor.execute(
+                    'INSERT INTO proxies (source, ip, port, country, anonymity, last_checked, refresh_id) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (source, ip, port) DO UPDATE SET country = excluded.country, '
+                    'anonymity = excluded.anonymity, last_checked = excluded.last_checked, '
+                    'refresh_id = excluded.refresh_id '
+                    'RETURNING id',
+                    (source, key[0], key[1], proxy.get('country'), proxy.get('anonymity'),
+                     proxy.get('last_checked'), refresh_id)
+                ).fetchone()[0]
+                if key not in current:
+                    # the same proxy can be listed twice by source, then protocols are merged
+                    cursor.execute('DELETE FROM protocols WHERE proxy_id = ?', (proxy_id,))
+                    protocols = frozenset(proxy['protocols'])
+                else:
+                    protocols = current[key][2] | frozenset(proxy['protocols'])
+                current[key] = (proxy.get('country'), proxy.get('anonymity'), protocols)
+                cursor.executemany(
+                    'INSERT OR IGNORE INTO protocols (protocol, proxy_id) VALUES (?, ?)',
+                    [(protocol, proxy_id) for protocol in proxy['protocols']]
+                )
+
+            cursor.execute('DELETE FROM proxies WHERE source = ? AND refresh_id != ?', (source, refresh_id))
+            cursor.execute('DELETE FROM crawl_pages WHERE source = ?', (source,))
+            cursor.execute(
+                'UPDATE sources SET last_update = ?, extra = ? WHERE source = ?',
+                (last_update, json.dumps(extra or {}), source)
+            )
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+
+        return ProxyDiff(
+            added=[f'{ip}:{port}' for ip, port in current.keys() - previous.keys()],
+            changed=[
+                f'{ip}:{port}' for (ip, port), value in current.items() if previous.get((ip, port), value) != value
+            ],
+            removed=[f'{ip}:{port}' for ip, port in previous.keys() - current.keys()],
+        )
+
+    def touch_source(self, source: str, last_update: int, extra: dict = None) -> None:
+        """
+            Set source last update without changing its proxies, e.g. if source is not modified since then
+        """
+
+        self.connection.execute(
+            'UPDATE sources SET last_update = ?, extra = ? WHERE source = ?',
+            (last_update, json.dumps(extra or {}), source)
+        )
+
+    def get_proxies_list(
+            self,
+            protocol: str = None,
+            source: str = None,
+            country: str = None,
+            anonymity: str = None,
+            unique: bool = False,
+    ) -> list[str]:
+        """
+            Return list of proxies in format "IP:PORT" based on filters.
+            Without `unique` proxy listed by several sources is returned for each of them
+        """
+
+        query = f'SELECT {"DISTINCT " if unique else ""}p.ip, p.port FROM proxies p'
+        conditions, params = [], []
+        if protocol:
+            query += ' JOIN protocols pr ON pr.proxy_id = p.id AND pr.protocol = ?'
+            params.append(protocol)
+        for column, value in (('source', source), ('country', country), ('anonymity', anonymity)):
+            if value:
+                conditions.append(f'p.{column} = ?')
+                params.append(value)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+
+        return [f'{ip}:{port}' for ip, port in self.connection.execute(query, params)]
+
+    def iter_proxies(self, source: str = None) -> Iterator[dict]:
+        """
+            Proxies as dicts in the same format as scrapers return them
+        """
+
+        query = 'SELECT p.*, GROUP_CONCAT(pr.protocol) AS protocols FROM proxies p ' \
+                'LEFT JOIN protocols pr ON pr.proxy_id = p.id'
+        params = []
+        if source:
+            query += ' WHERE p.source = ?'
+            params.append(source)
+        query += ' GROUP BY p.id ORDER BY p.id'
+
+        for row in self.connection.execute(query, params):
+            yield {
+                'source': row['source'],
+                'ip': row['ip'],
+                'port': str(row['port']),
+                'protocols': row['protocols'].split(',') if row['protocols'] else [],
+                'country': row['country'],
+                'anonymity': row['anonymity'],
+                'last_checked': row['last_checked'],
+            }
+
+    def load_scores(self) -> list[tuple]:
+        """
+            Rows of proxies scores in order of ProxyScore arguments
+        """
+
+        return [
+            tuple(row) for row in self.connection.execute(
+                'SELECT proxy, protocol, latency, successes, failures, last_success, updated_at FROM scores'
+            )
+        ]
+
+    def save_scores(self, rows: Iterable[tuple]) -> None:
+        """
+            Upsert rows of proxies scores in order of ProxyScore arguments
+        """
+
+        cursor = self.connection.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.executemany('INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+
+    def load_checks(self, protocol: str = None, target: str = None) -> list[tuple]:
+        """
+            Rows of recent checks results as (proxy, protocol, target, latency, checked_at, fail_streak, anonymity)
+        """
+
+        query = 'SELECT proxy, protocol, target, latency, checked_at, fail_streak, anonymity FROM checks'
+        conditions, params = [], []
+        for column, value in (('protocol', protocol), ('target', target)):
+            if value:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        return [tuple(row) for row in self.connection.execute(query, params)]
+
+    def save_checks(self, rows: Iterable[tuple]) -> None:
+        """
+            Upsert rows of checks results in order of `load_checks()` columns
+        """
+
+        cursor = self.connection.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.executemany(
+                'INSERT OR REPLACE INTO checks (proxy, protocol, target, latency, checked_at, fail_streak, anonymity) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+
+    def load_crawl(self, source: str, max_age: float) -> dict[int, list[dict]]:
+        """
+            Proxies of pages saved by unfinished crawl of source, pages older than `max_age` seconds are dropped
+        """
+
+        self.connection.execute(
+            'DELETE FROM crawl_pages WHERE source = ? AND crawled_at < ?', (source, time.time() - max_age)
+        )
+        return {
+            page: json.loads(proxies) for page, proxies in self.connection.execute(
+                'SELECT page, proxies FROM crawl_pages WHERE source = ?', (source,)
+            )
+        }
+
+    def save_crawl_page(self, source: str, page: int, proxies: list[dict]) -> None:
+        """
+            Save proxies of crawled page, so interrupted crawl can skip it
+        """
+
+        self.connection.execute(
+            'INSERT OR REPLACE INTO crawl_pages (source, page, proxies, crawled_at) VALUES (?, ?, ?, ?)',
+            (source, page, json.dumps(proxies), time.time())
+        )
+
+    def to_dict(self) -> dict[dict]:
+        """
+            Whole database in format of json file used before
+        """
+
+        data = {source: website_data | {'proxies': []} for source, website_data in self.get_sources().items()}
+        for proxy in self.iter_proxies():
+            data[proxy.pop('source')]['proxies'].append(proxy)
+        return data